@@ -3,6 +3,7 @@ FastAPI application — REST API for AutomotiveGPT.
 
 Routes:
   POST   /api/v1/chat                  – send a message, get an answer
+  POST   /api/v1/chat/stream           – same, streamed as Server-Sent Events
   GET    /api/v1/conversations/{id}    – retrieve conversation history
   DELETE /api/v1/conversations/{id}    – clear a conversation
   GET    /api/v1/vehicles              – list all indexed vehicle models
@@ -14,6 +15,14 @@ Caching:
   Cache TTL = 1 hour.  Cache is bypassed when conversation_id changes
   (because context changes with history).
 
+Idempotency:
+  POST /chat and /chat/stream honour an ``Idempotency-Key`` header.
+  The first request claims the key atomically (SET NX); its response
+  is kept in Redis for 10 minutes and replayed verbatim for any retry
+  carrying the same key, so a resent request never appends the turn
+  twice.  A duplicate that arrives while the first is still running
+  gets 409; a failed request releases its claim so it can be retried.
+
 CORS:
   Configured for local Streamlit dev (localhost:8501) and can be
   extended for production origins.
@@ -29,8 +38,9 @@ import time
 from pathlib import Path
 
 import redis
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from src.config import settings
@@ -75,12 +85,58 @@ def _cache_set(key: str, value: dict) -> None:
     _redis.setex(key, _CACHE_TTL, json.dumps(value))
 
 
+_IDEMPOTENCY_TTL = 600  # 10 minutes — long enough to cover client retries
+_IDEMPOTENCY_CLAIM_TTL = 120  # a claim whose worker died frees up after this
+_IN_FLIGHT = "null"  # claimed, response not stored yet
+
+
+def _idempotency_key(key: str) -> str:
+    return "agpt_idem:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _idempotent_get(key: str) -> dict | None:
+    val = _redis.get(_idempotency_key(key))
+    return json.loads(val) if val else None
+
+
+def _idempotent_set(key: str, value: dict) -> None:
+    _redis.setex(_idempotency_key(key), _IDEMPOTENCY_TTL, json.dumps(value))
+
+
+def _idempotent_claim(key: str) -> dict | None:
+    """Claim *key* for this request, or return the response stored for it.
+
+    SET NX makes the claim atomic, so of two concurrent duplicates only
+    one runs.  Returns None if the claim succeeded.
+
+    Raises:
+        HTTPException 409: the first request with this key is still running.
+    """
+    if _redis.set(_idempotency_key(key), _IN_FLIGHT, nx=True, ex=_IDEMPOTENCY_CLAIM_TTL):
+        return None
+    replay = _idempotent_get(key)
+    if replay is None:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress.")
+    return replay
+
+
+def _idempotent_release(key: str) -> None:
+    """Drop a claim whose request failed, so a retry can run."""
+    _redis.delete(_idempotency_key(key))
+
+
 # ── Pydantic schemas ──────────────────────────────────────────────────
+# A scalar must match exactly; a list matches any of its items.
+FilterValue = str | int | float | list[str | int | float] | None
+
+
 class ChatRequest(BaseModel):
     conversation_id: str | None = Field(default=None, description="Existing conversation to continue, or null to start new")
     session_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Client session identifier")
     message: str = Field(..., min_length=1, description="The user's question")
-    filters: dict | None = Field(default=None, description="Vehicle filters: make, model, year, subsystem")
+    filters: dict[str, FilterValue] | None = Field(default=None, description="Vehicle filters: make, model, year, subsystem")
+    create_if_missing: bool = Field(default=True, description="Start a new conversation if conversation_id is null or unknown")
+    reset: bool = Field(default=False, description="Delete conversation_id first and answer in a fresh conversation")
 
 
 class SourceInfo(BaseModel):
@@ -167,48 +223,108 @@ async def health():
     return HealthResponse(status="ok" if (redis_ok and db_ok) else "degraded", redis=redis_ok, db=db_ok)
 
 
+def _open_conversation(request: ChatRequest) -> tuple[str, list[dict]]:
+    """Reset/create/resume the conversation; return (conv_id, history)."""
+    # Checked before anything is deleted: a reset always needs a new conversation
+    if request.reset and not request.create_if_missing:
+        raise HTTPException(status_code=422, detail="reset requires create_if_missing to be true.")
+    conv_id = request.conversation_id
+    if conv_id is not None and request.reset:
+        _store.delete(conv_id)
+        conv_id = None
+
+    history = _store.get_history_for_prompt(conv_id) if conv_id else []
+    if conv_id is not None and not history and not _store.exists(conv_id):
+        if not request.create_if_missing:
+            raise HTTPException(status_code=404, detail="Conversation not found.")
+        conv_id = None
+
+    if conv_id is None:
+        if not request.create_if_missing:
+            raise HTTPException(status_code=422, detail="conversation_id is required when create_if_missing is false.")
+        conv_id = _store.create(
+            session_id=request.session_id,
+            filters=request.filters,
+        )
+    elif request.filters:
+        # Update filters if provided
+        _store.update_filters(conv_id, request.filters)
+    return conv_id, history
+
+
+def _serve_from_cache(request: ChatRequest, conv_id: str, cache_key: str) -> dict | None:
+    """Return the cached response for a first-turn query, persisting the turn."""
+    cached_result = _cache_get(cache_key)
+    if not cached_result:
+        return None
+    # Still persist the messages even when serving from cache
+    _store.append_message(conv_id, role="user", content=request.message)
+    _store.append_message(conv_id, role="assistant", content=cached_result["answer"])
+    cached_result["conversation_id"] = conv_id
+    cached_result["cached"] = True
+    logger.info("Cache hit for query '%s…'", request.message[:50])
+    return cached_result
+
+
+def _persist_turn(request: ChatRequest, conv_id: str, answer: str, confidence: float, sources: list[dict]) -> None:
+    _store.append_message(
+        conv_id, role="user", content=request.message,
+        metadata={"filters": request.filters},
+    )
+    _store.append_message(
+        conv_id, role="assistant", content=answer,
+        metadata={"confidence": confidence, "sources": sources},
+    )
+
+
 @app.post("/api/v1/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(
+    request: ChatRequest,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+):
     """Process a user message and return an answer with citations.
 
     Flow:
-      1. Create or resume a conversation in PostgreSQL.
-      2. Check Redis cache (skip if conversation has history, since
+      1. Claim the Idempotency-Key, or replay the response stored for it.
+      2. Reset (delete) the conversation if asked, then create or
+         resume it in PostgreSQL — all within this one request.
+      3. Check Redis cache (skip if conversation has history, since
          context changes with each turn).
-      3. Run HybridRetriever with the user's filters.
-      4. Run AutomotiveGenerator with retrieved context + history.
-      5. Persist both the user message and the assistant answer.
-      6. Cache the response if it was a fresh (no-history) query.
+      4. Run HybridRetriever with the user's filters.
+      5. Run AutomotiveGenerator with retrieved context + history.
+      6. Persist both the user message and the assistant answer.
+      7. Cache the response if it was a fresh (no-history) query.
     """
+    if idempotency_key:
+        replay = _idempotent_claim(idempotency_key)
+        if replay:
+            logger.info("Idempotent replay for key '%s'", idempotency_key)
+            return ChatResponse(**replay)
+
+    try:
+        response_data = _answer(request)
+    except Exception:
+        if idempotency_key:
+            _idempotent_release(idempotency_key)
+        raise
+
+    if idempotency_key:
+        _idempotent_set(idempotency_key, response_data)
+    return ChatResponse(**response_data)
+
+
+def _answer(request: ChatRequest) -> dict:
+    """Steps 2–7 of /chat; returns the ChatResponse payload."""
     start = time.perf_counter()
 
     # ── Conversation setup ──────────────────────────────────────
-    conv_id = request.conversation_id
-    if conv_id is None:
-        conv_id = _store.create(
-            session_id=request.session_id,
-            filters=request.filters,
-        )
-    else:
-        # Update filters if provided
-        if request.filters:
-            _store.update_filters(conv_id, request.filters)
+    conv_id, history = _open_conversation(request)
 
     # ── Cache check (only for first message in a conversation) ─
-    history = _store.get_history_for_prompt(conv_id)
     cache_key = _cache_key(request.message, request.filters)
-    cached_result = None
-    if not history:  # only cache single-turn queries
-        cached_result = _cache_get(cache_key)
-
+    cached_result = None if history else _serve_from_cache(request, conv_id, cache_key)
     if cached_result:
-        # Still persist the messages even when serving from cache
-        _store.append_message(conv_id, role="user", content=request.message)
-        _store.append_message(conv_id, role="assistant", content=cached_result["answer"])
-        cached_result["conversation_id"] = conv_id
-        cached_result["cached"] = True
-        logger.info("Cache hit for query '%s…'", request.message[:50])
-        return ChatResponse(**cached_result)
+        return cached_result
 
     # ── Retrieval ───────────────────────────────────────────────
     chunks = _retriever.retrieve(request.message, request.filters)
@@ -221,14 +337,7 @@ async def chat(request: ChatRequest):
     )
 
     # ── Persist ─────────────────────────────────────────────────
-    _store.append_message(
-        conv_id, role="user", content=request.message,
-        metadata={"filters": request.filters},
-    )
-    _store.append_message(
-        conv_id, role="assistant", content=result.answer,
-        metadata={"confidence": result.confidence, "sources": result.sources},
-    )
+    _persist_turn(request, conv_id, result.answer, result.confidence, result.sources)
 
     # ── Cache (single-turn only) ────────────────────────────────
     response_data = {
@@ -242,10 +351,92 @@ async def chat(request: ChatRequest):
     if not history:
         _cache_set(cache_key, response_data)
 
-    elapsed_ms = int((time.perf_counter() - start) * 1000)
-    response_data["latency_ms"] = elapsed_ms
+    response_data["latency_ms"] = int((time.perf_counter() - start) * 1000)
+    return response_data
 
-    return ChatResponse(**response_data)
+
+def _sse(data: dict, event: str | None = None) -> str:
+    """Format one Server-Sent Event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/v1/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+):
+    """Streaming variant of /chat over Server-Sent Events.
+
+    Emits ``data: {"delta": "..."}`` events as tokens arrive, then a
+    final ``event: done`` whose data is the full ChatResponse payload
+    (answer, confidence, sources, latency).  A failure mid-stream is
+    reported as ``event: error`` with ``{"detail": ...}``.  Setup,
+    caching, persistence and idempotency match /chat; cached and
+    replayed answers arrive as a single delta.
+    """
+    start = time.perf_counter()
+
+    replay = _idempotent_claim(idempotency_key) if idempotency_key else None
+    if replay:
+        logger.info("Idempotent replay for key '%s'", idempotency_key)
+        conv_id = history = cache_key = None
+    else:
+        try:
+            conv_id, history = _open_conversation(request)
+            cache_key = _cache_key(request.message, request.filters)
+            replay = None if history else _serve_from_cache(request, conv_id, cache_key)
+        except Exception:
+            if idempotency_key:
+                _idempotent_release(idempotency_key)
+            raise
+
+    def events():
+        if replay:
+            if idempotency_key:
+                _idempotent_set(idempotency_key, replay)
+            yield _sse({"delta": replay["answer"]})
+            yield _sse(ChatResponse(**replay).model_dump(), event="done")
+            return
+        stored = False
+        try:
+            chunks = _retriever.retrieve(request.message, request.filters)
+            stream = _generator.stream(
+                query=request.message,
+                context_chunks=chunks,
+                conversation_history=history,
+            )
+            for token in stream:
+                yield _sse({"delta": token})
+
+            confidence = _generator.compute_confidence(chunks)
+            sources = _generator.extract_sources(chunks)
+            _persist_turn(request, conv_id, stream.full_text, confidence, sources)
+
+            response_data = {
+                "conversation_id": conv_id,
+                "answer": stream.full_text,
+                "confidence": confidence,
+                "sources": sources,
+                "latency_ms": int((time.perf_counter() - start) * 1000),
+                "cached": False,
+            }
+            if not history:
+                _cache_set(cache_key, response_data)
+            if idempotency_key:
+                _idempotent_set(idempotency_key, response_data)
+                stored = True
+        except Exception as exc:
+            logger.exception("Streaming chat failed")
+            yield _sse({"detail": str(exc)}, event="error")
+            return
+        finally:
+            # Failed or abandoned (client disconnect) — free the key for a retry
+            if idempotency_key and not stored:
+                _idempotent_release(idempotency_key)
+        yield _sse(ChatResponse(**response_data).model_dump(), event="done")
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 @app.get("/api/v1/conversations/{conversation_id}", response_model=ConversationResponse)
@@ -45,6 +45,7 @@ class Settings(BaseSettings):
     chunk_overlap: int = Field(default=50)
     top_k_retrieval: int = Field(default=10)
     rerank_top_n: int = Field(default=5)
+    embedding_cache_size: int = Field(default=4096, description="Max cached query embeddings")
 
     # ── Derived ───────────────────────────────────────────────
     @property
@@ -27,7 +27,7 @@ from openai import OpenAI
 from src.config import settings
 from src.retrieval.dense_retriever import RetrievedChunk
 from src.generation.prompts import SYSTEM_PROMPT, FEW_SHOT_EXAMPLES, format_context
-from src.generation.streamer import Streamer
+from src.generation.streamer import Streamer, StreamingResponse
 
 logger = logging.getLogger(__name__)
 
@@ -79,6 +79,25 @@ class AutomotiveGenerator:
             return self._generate_streaming(messages, context_chunks)
         return self._generate_sync(messages, context_chunks)
 
+    def stream(
+        self,
+        query: str,
+        context_chunks: list[RetrievedChunk],
+        conversation_history: list[dict] | None = None,
+    ) -> StreamingResponse:
+        """Open a token stream for this turn, whatever the configured mode.
+
+        Unlike the streaming ``generate()`` path this returns the
+        StreamingResponse itself, so callers can read ``full_text`` once
+        it is consumed.  Confidence and sources do not depend on the
+        answer; get them from ``compute_confidence(context_chunks)`` and
+        ``extract_sources(context_chunks)``.
+        """
+        if self.streamer is None:
+            self.streamer = Streamer()
+        messages = self._build_messages(query, context_chunks, conversation_history)
+        return self.streamer.stream(messages)
+
     # ── Streaming path ────────────────────────────────────────────
     def _generate_streaming(
         self,
@@ -115,8 +134,8 @@ class AutomotiveGenerator:
 
         return GenerationResult(
             answer=answer,
-            confidence=self._compute_confidence(context_chunks),
-            sources=self._extract_sources(context_chunks),
+            confidence=self.compute_confidence(context_chunks),
+            sources=self.extract_sources(context_chunks),
             latency_ms=elapsed_ms,
             usage={
                 "prompt_tokens": response.usage.prompt_tokens,
@@ -167,7 +186,7 @@ class AutomotiveGenerator:
 
     # ── Confidence & source extraction ────────────────────────────
     @staticmethod
-    def _compute_confidence(chunks: list[RetrievedChunk]) -> float:
+    def compute_confidence(chunks: list[RetrievedChunk]) -> float:
         """Approximate confidence from retrieval scores.
 
         Uses the mean of the top-3 rerank scores.  If no chunks were
@@ -179,7 +198,7 @@ class AutomotiveGenerator:
         return round(sum(top_scores) / len(top_scores), 3)
 
     @staticmethod
-    def _extract_sources(chunks: list[RetrievedChunk]) -> list[dict]:
+    def extract_sources(chunks: list[RetrievedChunk]) -> list[dict]:
         """Return a lightweight source list for the API response."""
         sources: list[dict] = []
         for idx, chunk in enumerate(chunks, start=1):
@@ -24,8 +24,8 @@ Metadata schema stored per vector:
 
 from __future__ import annotations
 
+import hashlib
 import logging
-import uuid
 from typing import Any
 
 from pinecone import Pinecone, ServerlessSpec
@@ -39,6 +39,17 @@ _UPSERT_BATCH = 50
 _DIMENSION = 3072  # text-embedding-3-large
 
 
+def _content_id(ec: EmbeddedChunk) -> str:
+    """Deterministic fallback id for a chunk that arrived without one.
+
+    blake2b-64 over source file + text: stable across processes (unlike
+    hash()), so re-ingesting the same chunk overwrites its vector.
+    """
+    source = str(ec.metadata.get("source_file", ""))
+    digest = hashlib.blake2b(f"{source}\0{ec.text}".encode(), digest_size=8)
+    return digest.hexdigest()
+
+
 class PineconeIndexer:
     """Manages upsert and lifecycle of the Pinecone index.
 
@@ -114,9 +125,11 @@ class PineconeIndexer:
         # Build the vector records
         records: list[tuple[str, list[float], dict[str, Any]]] = []
         for ec in embedded_chunks:
-            vec_id = ec.metadata.get("chunk_id") or str(uuid.uuid4())
+            vec_id = ec.metadata.get("chunk_id") or _content_id(ec)
             # Ensure metadata values are Pinecone-compatible types
             meta = self._sanitise_metadata(ec.metadata)
+            # Retrievers dedupe on chunk_id, so it must always be present
+            meta["chunk_id"] = vec_id
             # Store the original text so we can return it at query time
             meta["text"] = ec.text
             records.append((vec_id, ec.vector, meta))
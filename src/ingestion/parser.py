@@ -14,12 +14,13 @@ from __future__ import annotations
 import logging
 import re
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Literal
 
 import PyPDF2
 from docx import Document as DocxDocument
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 logger = logging.getLogger(__name__)
 
@@ -36,12 +37,29 @@ class ParsedSection:
 
 
 # ── Utility helpers ──────────────────────────────────────────────────
+_WS_RE = re.compile(r"\s+")
+
+
 def _clean(text: str) -> str:
     """Strip and collapse internal whitespace."""
-    return re.sub(r"\s+", " ", text).strip()
+    # isprintable() is False for every whitespace char except " ", so
+    # text with no double spaces has nothing for the regex to collapse.
+    if "  " not in text and text.isprintable():
+        return text.strip()
+    return _WS_RE.sub(" ", text).strip()
 
 
-def _table_to_text(rows: list[list[str]]) -> str:
+@dataclass(frozen=True)
+class TableText:
+    """Serialised table: the joined text plus each row's line."""
+    text: str
+    rows: tuple[str, ...]
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def _table_to_text(rows: list[list[str]]) -> TableText:
     """Serialise a 2-D table into aligned pipe-delimited text.
 
     Example:
@@ -49,19 +67,19 @@ def _table_to_text(rows: list[list[str]]) -> str:
         | Honda | Civic | 2022 |
     """
     if not rows:
-        return ""
+        return TableText("", ())
     col_count = max(len(row) for row in rows)
     widths = [0] * col_count
     for row in rows:
         for i, cell in enumerate(row):
             widths[i] = max(widths[i], len(cell))
 
-    lines: list[str] = []
-    for row in rows:
-        padded = [row[i].ljust(widths[i]) if i < len(row) else " " * widths[i]
-                  for i in range(col_count)]
-        lines.append("| " + " | ".join(padded) + " |")
-    return "\n".join(lines)
+    lines = tuple(
+        "| " + " | ".join(row[i].ljust(widths[i]) if i < len(row) else " " * widths[i]
+                          for i in range(col_count)) + " |"
+        for row in rows
+    )
+    return TableText("\n".join(lines), lines)
 
 
 # ── PDF Parser ────────────────────────────────────────────────────────
@@ -154,7 +172,7 @@ class DOCXParser:
                         for row in table.rows]
 
                 sections.append(ParsedSection(
-                    text=_table_to_text(rows),
+                    text=_table_to_text(rows).text,
                     metadata={
                         "source_file": file_path.name,
                         "page": 1,
@@ -169,6 +187,26 @@ class DOCXParser:
 
 
 # ── HTML Parser ───────────────────────────────────────────────────────
+# Only <body> is walked, so <head> (meta, inline scripts and styles) is
+# never built into the tree.  Narrower strainers would also keep tags
+# nested inside nav/footer and drop generic <div> blocks.
+_BODY_ONLY = SoupStrainer("body")
+
+
+@lru_cache(maxsize=16)
+def _load_soup(path: str, mtime_ns: int, size: int, skip_tags: frozenset[str]) -> BeautifulSoup:
+    """Parse an HTML file with *skip_tags* removed.
+
+    mtime and size are part of the cache key only, so re-ingesting an
+    unchanged file reuses the tree and an edited file is re-parsed.
+    The returned soup is shared between callers and must not be mutated.
+    """
+    soup = BeautifulSoup(Path(path).read_text(encoding="utf-8"), "lxml", parse_only=_BODY_ONLY)
+    for tag in soup.find_all(skip_tags):
+        tag.decompose()
+    return soup
+
+
 class HTMLParser:
     """Extract structured content from HTML via BeautifulSoup.
 
@@ -176,14 +214,11 @@ class HTMLParser:
     before processing so only content nodes remain.
     """
 
-    SKIP_TAGS = {"script", "style", "nav", "footer", "header", "noscript", "svg"}
+    SKIP_TAGS = frozenset({"script", "style", "nav", "footer", "header", "noscript", "svg"})
 
     def parse(self, file_path: Path) -> list[ParsedSection]:
-        html = file_path.read_text(encoding="utf-8")
-        soup = BeautifulSoup(html, "html.parser")
-
-        for tag in soup.find_all(self.SKIP_TAGS):
-            tag.decompose()
+        stat = file_path.stat()
+        soup = _load_soup(str(file_path), stat.st_mtime_ns, stat.st_size, self.SKIP_TAGS)
 
         sections: list[ParsedSection] = []
         body_children = soup.body.children if soup.body else []
@@ -235,7 +270,7 @@ class HTMLParser:
                         rows.append(cells)
                 if rows:
                     sections.append(ParsedSection(
-                        text=_table_to_text(rows),
+                        text=_table_to_text(rows).text,
                         metadata={
                             "source_file": file_path.name,
                             "page": 1,
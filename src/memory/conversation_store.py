@@ -8,14 +8,15 @@ Schema (single table for simplicity):
     created_at      – timestamp
     updated_at      – timestamp
     messages        – JSONB array of {role, content, metadata} dicts
-    filters         – JSONB of the last-used vehicle filters
+    filters         – JSONB of the last-used vehicle filters (GIN-indexed)
 
 The `messages` column stores the full conversation as a flat list
 so we can append in O(1) and replay the entire history in one query.
 
 A `get_history_for_prompt()` helper returns only the (role, content)
 pairs needed for the OpenAI messages list, trimmed to a max token
-budget so we never blow the context window.
+budget so we never blow the context window.  Messages that fall
+outside the budget are replaced by a short "Prior summary" message.
 """
 
 from __future__ import annotations
@@ -24,9 +25,9 @@ import logging
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import create_engine, Column, String, DateTime, JSON
+from sqlalchemy import create_engine, Column, String, DateTime, Index, text
 from sqlalchemy.orm import declarative_base, Session as SASession
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID as PG_UUID
 
 from src.config import settings
 
@@ -34,6 +35,41 @@ logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# ── Prompt-history budgeting ──────────────────────────────────────────
+_CHARS_PER_TOKEN = 4            # same heuristic as the chunker
+_MESSAGE_OVERHEAD_TOKENS = 4    # role tag + separators per chat message
+_SUMMARY_MAX_CHARS = 500
+
+
+def _approx_tokens(content: str) -> int:
+    """Approximate prompt tokens for one chat message."""
+    return len(content) // _CHARS_PER_TOKEN + _MESSAGE_OVERHEAD_TOKENS
+
+
+_SUMMARY_PREFIX = "Prior summary: "
+# Worst-case cost of the summary message, held back from the budget
+# whenever older messages have to be folded into it.
+_SUMMARY_RESERVE = _approx_tokens(_SUMMARY_PREFIX + "x" * _SUMMARY_MAX_CHARS)
+
+
+def _fit_from_end(messages: list[dict], budget: int) -> int:
+    """Index of the oldest message kept when filling *budget* newest-first."""
+    start = len(messages)
+    while start > 0:
+        cost = _approx_tokens(messages[start - 1]["content"])
+        if cost > budget:
+            break
+        budget -= cost
+        start -= 1
+    return start
+
+
+def _summarise_prefix(messages: list[dict]) -> str:
+    """Heuristic summary of dropped messages: role-tagged text, capped."""
+    joined = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    return joined[:_SUMMARY_MAX_CHARS]
+
+
 # ── ORM model ─────────────────────────────────────────────────────────
 class Conversation(Base):
     __tablename__ = "conversations"
@@ -43,17 +79,48 @@ class Conversation(Base):
     created_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc),
                         onupdate=datetime.now(timezone.utc))
-    messages = Column(JSON, default=list)   # list of {role, content, metadata}
-    filters = Column(JSON, default=dict)    # last-used vehicle filters
+    messages = Column(JSONB, default=list)  # list of {role, content, metadata}
+    filters = Column(JSONB, default=dict)   # last-used vehicle filters
+
+    __table_args__ = (
+        # Makes containment queries on filters (filters @> '{"make": …}') indexable
+        Index("ix_conv_filters_gin", "filters", postgresql_using="gin"),
+    )
 
 
 # ── Engine & session factory ──────────────────────────────────────────
 _engine = create_engine(settings.postgres_url, pool_pre_ping=True)
 
 
+# Upgrades tables created before the JSON → JSONB switch.  Each
+# statement is a no-op on an up-to-date schema.
+_JSONB_COLUMNS = ("messages", "filters")
+
+
+def _migrate_json_to_jsonb(conn) -> None:
+    """ALTER legacy `json` columns to `jsonb` and ensure the GIN index exists."""
+    for column in _JSONB_COLUMNS:
+        data_type = conn.execute(text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'conversations' AND column_name = :col"
+        ), {"col": column}).scalar()
+        if data_type == "json":
+            logger.info("Migrating conversations.%s to jsonb…", column)
+            conn.execute(text(
+                f"ALTER TABLE conversations ALTER COLUMN {column} "
+                f"TYPE jsonb USING {column}::jsonb"
+            ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_conv_filters_gin "
+        "ON conversations USING gin (filters)"
+    ))
+
+
 def init_db() -> None:
     """Create tables if they don't exist.  Safe to call on every startup."""
     Base.metadata.create_all(_engine)
+    with _engine.begin() as conn:
+        _migrate_json_to_jsonb(conn)
     logger.info("Database tables ensured.")
 
 
@@ -137,24 +204,72 @@ class ConversationStore:
                 "filters": conv.filters,
             }
 
+    def exists(self, conversation_id: str) -> bool:
+        """Return True if the conversation exists (primary-key lookup only)."""
+        with _get_session() as db:
+            return db.query(Conversation.id).filter_by(id=conversation_id).first() is not None
+
     def get_history_for_prompt(
         self,
         conversation_id: str,
-        max_messages: int = 20,
+        max_tokens: int = 3000,
     ) -> list[dict]:
-        """Return the last N messages as [{role, content}, …] for the OpenAI messages list.
+        """Return recent messages as [{role, content}, …] for the OpenAI messages list.
 
-        We cap at max_messages (default 20) to stay within the context
-        window budget.  The most recent messages are kept.
+        Messages are taken newest-first until *max_tokens* (≈4 chars per
+        token) would be exceeded.  Anything older is folded into a single
+        leading ``{"role": "system", "content": "Prior summary: …"}``
+        message, whose cost counts against the same budget, so the model keeps the gist of a long conversation
+        without being billed for all of it.  The summary is stored on the
+        first message's metadata and reused on later turns.
         """
         with _get_session() as db:
             conv = db.query(Conversation).filter_by(id=conversation_id).one_or_none()
             if conv is None:
                 return []
 
-            # Take the tail (most recent) messages
-            recent = conv.messages[-max_messages:]
-            return [{"role": m["role"], "content": m["content"]} for m in recent]
+            messages = conv.messages or []
+
+            # Walk backwards from the newest message until the budget runs
+            # out.  If not everything fits, a summary message will lead the
+            # result, so walk again with its worst-case cost held back.
+            start = _fit_from_end(messages, max_tokens)
+            if start > 0:
+                start = _fit_from_end(messages, max_tokens - _SUMMARY_RESERVE)
+
+            recent = [{"role": m["role"], "content": m["content"]} for m in messages[start:]]
+            if start == 0:
+                return recent
+
+            # ── Summarise the dropped prefix messages[:start] ────────
+            first_meta = messages[0].get("metadata") or {}
+            cached = first_meta.get("prefix_summary")
+            cached_upto = first_meta.get("summary_of_prefix_up_to", 0)
+            # A head-capped summary stays identical as the prefix grows
+            if cached is not None and (
+                cached_upto == start
+                or (cached_upto < start and len(cached) >= _SUMMARY_MAX_CHARS)
+            ):
+                summary = cached
+            else:
+                summary = _summarise_prefix(messages[:start])
+                updated = list(messages)  # copy so SQLAlchemy detects the change
+                updated[0] = {
+                    **messages[0],
+                    "metadata": {
+                        **first_meta,
+                        "prefix_summary": summary,
+                        "summary_of_prefix_up_to": start,
+                    },
+                }
+                conv.messages = updated
+                db.commit()
+
+            content = _SUMMARY_PREFIX + summary
+            if max_tokens < _SUMMARY_RESERVE:
+                # Budget smaller than a full summary: cut it to what fits
+                content = content[:max(0, max_tokens - _MESSAGE_OVERHEAD_TOKENS) * _CHARS_PER_TOKEN]
+            return [{"role": "system", "content": content}, *recent]
 
     def get_filters(self, conversation_id: str) -> dict:
         """Return the stored filters for a conversation."""
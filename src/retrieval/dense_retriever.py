@@ -11,8 +11,13 @@ are scored.
 from __future__ import annotations
 
 import logging
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
 
+import numpy as np
 from openai import OpenAI
 from pinecone import Pinecone
 
@@ -27,6 +32,43 @@ class RetrievedChunk:
     text: str
     score: float                                   # 0–1 (cosine similarity or BM25-normalised)
     metadata: dict = field(default_factory=dict)   # source_file, page, …
+    chunk_id: str | None = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Read once here so RRF doesn't go through metadata per chunk
+        self.chunk_id = self.metadata.get("chunk_id")
+
+
+def _normalise_query(query: str) -> str:
+    """Cache key for a query: lowercased, whitespace collapsed."""
+    return " ".join(query.lower().split())
+
+
+class _EmbeddingCache:
+    """Bounded, thread-safe LRU of query → embedding vector.
+
+    Vectors are stored as read-only float32 arrays: ~12 KB for a
+    3072-dim embedding, against ~100 KB as a list of Python floats.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str]) -> np.ndarray | None:
+        with self._lock:
+            vector = self._data.get(key)
+            if vector is not None:
+                self._data.move_to_end(key)
+            return vector
+
+    def put(self, key: tuple[str, str], vector: np.ndarray) -> None:
+        with self._lock:
+            self._data[key] = vector
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
 
 
 class DenseRetriever:
@@ -41,30 +83,36 @@ class DenseRetriever:
         self.openai = OpenAI(api_key=settings.openai_api_key)
         self.pc = Pinecone(api_key=settings.pinecone_api_key)
         self.index = self.pc.Index(settings.pinecone_index_name)
+        # Repeated questions (retries, refine loops) skip the embedding call
+        self._embedding_cache = _EmbeddingCache(settings.embedding_cache_size)
 
     # ── Public interface ──────────────────────────────────────────
     def retrieve(
         self,
         query: str,
         filters: dict | None = None,
+        query_vector: np.ndarray | list[float] | None = None,
     ) -> list[RetrievedChunk]:
         """Retrieve the top-k most semantically similar chunks.
 
         Args:
-            query:   The user's natural-language question.
-            filters: Optional dict with keys like make, model, year,
-                     subsystem.  Converted to a Pinecone filter expression.
+            query:        The user's natural-language question.
+            filters:      Optional dict with keys like make, model, year,
+                          subsystem.  Converted to a Pinecone filter expression.
+            query_vector: Pre-computed embedding of *query* (e.g. from
+                          embed_many).  Skips the embedding call if given.
 
         Returns:
             List of RetrievedChunk sorted by descending similarity score.
         """
-        query_vector = self._embed_query(query)
+        if query_vector is None:
+            query_vector = self._embed_query(query)
         pinecone_filter = self._build_filter(filters) if filters else None
 
         logger.info("Dense retrieval: top_k=%d, filter=%s", self.top_k, pinecone_filter)
 
         response = self.index.query(
-            vector=query_vector,
+            vector=np.asarray(query_vector, dtype=np.float32).tolist(),
             top_k=self.top_k,
             filter=pinecone_filter,
             include_metadata=True,
@@ -74,6 +122,7 @@ class DenseRetriever:
         for match in response.matches:
             meta = dict(match.metadata) if match.metadata else {}
             text = meta.pop("text", "")  # text was stored in metadata at upsert time
+            meta.setdefault("chunk_id", match.id)  # vector id == chunk_id
             results.append(RetrievedChunk(
                 text=text,
                 score=match.score,
@@ -83,14 +132,48 @@ class DenseRetriever:
         logger.info("Dense retrieval returned %d results.", len(results))
         return results
 
+    def embed_many(self, queries: list[str]) -> list[np.ndarray]:
+        """Embed several queries with at most one OpenAI call.
+
+        Queries already in the embedding cache are served locally; the
+        rest are sent in a single batch, so N comparison sub-queries
+        cost one round-trip instead of N.  Vectors are returned in
+        input order, as the cache's shared float32 arrays (read-only).
+        """
+        model = settings.openai_embedding_model
+        keys = [(model, _normalise_query(q)) for q in queries]
+        vectors = [self._embedding_cache.get(key) for key in keys]
+
+        # Deduplicate misses so equivalent queries are never sent twice
+        missing: dict[tuple[str, str], str] = {}
+        for query, key, vec in zip(queries, keys, vectors):
+            if vec is None:
+                missing.setdefault(key, query)
+
+        if missing:
+            logger.debug("Embedding cache: %d hit(s), %d miss(es).",
+                         len(keys) - len(missing), len(missing))
+            response = self.openai.embeddings.create(
+                model=model,
+                input=list(missing.values()),
+            )
+            # Restore input order in case the API returns data out of order
+            sorted_data = sorted(response.data, key=lambda obj: obj.index)
+            fresh = {}
+            for key, item in zip(missing, sorted_data):
+                vector = np.asarray(item.embedding, dtype=np.float32)
+                vector.flags.writeable = False
+                fresh[key] = vector
+                self._embedding_cache.put(key, vector)
+            vectors = [vec if vec is not None else fresh[key]
+                       for key, vec in zip(keys, vectors)]
+
+        return vectors
+
     # ── Helpers ───────────────────────────────────────────────────
-    def _embed_query(self, query: str) -> list[float]:
-        """Embed a single query string."""
-        response = self.openai.embeddings.create(
-            model=settings.openai_embedding_model,
-            input=[query],
-        )
-        return response.data[0].embedding
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a single query string (cached)."""
+        return self.embed_many([query])[0]
 
     @staticmethod
     def _build_filter(filters: dict) -> dict | None:
@@ -99,14 +182,48 @@ class DenseRetriever:
         Supported keys: make, model, year, subsystem.
         Example input:  {"make": "Honda", "year": 2022}
         Example output: {"$and": [{"make": {"$eq": "Honda"}}, {"year": {"$eq": 2022}}]}
+
+        A list value matches any of its items:
+            {"make": ["Honda", "Acura"]} → {"make": {"$in": ["Honda", "Acura"]}}
+
+        Results are memoised on the canonical filter key, since a
+        session's filters rarely change from one turn to the next.
+        The returned dict is shared between callers; don't mutate it.
+
+        Raises:
+            ValueError: a value is neither a scalar nor a list of scalars.
         """
-        clauses: list[dict] = []
-        for key in ("make", "model", "year", "subsystem"):
-            if key in filters and filters[key] is not None:
-                clauses.append({key: {"$eq": filters[key]}})
-
-        if not clauses:
-            return None
-        if len(clauses) == 1:
-            return clauses[0]
-        return {"$and": clauses}
+        return _pinecone_filter(_filter_key(filters))
+
+
+# ── Filter memoisation ────────────────────────────────────────────────
+_FILTER_KEYS = ("make", "model", "year", "subsystem")
+_SCALAR_TYPES = (str, int, float, bool)
+
+
+def _freeze(key: str, value: Any) -> Any:
+    """Validate one filter value; lists become tuples so the key stays hashable."""
+    if isinstance(value, _SCALAR_TYPES):
+        return value
+    if isinstance(value, list) and all(isinstance(v, _SCALAR_TYPES) for v in value):
+        return tuple(value)
+    raise ValueError(f"Filter '{key}' must be a scalar or a list of scalars, got {value!r}")
+
+
+def _filter_key(filters: dict) -> tuple[tuple[str, Any], ...]:
+    """Canonical, hashable form of the active filters (fixed key order)."""
+    return tuple((k, _freeze(k, filters[k])) for k in _FILTER_KEYS if filters.get(k) is not None)
+
+
+@lru_cache(maxsize=256)
+def _pinecone_filter(key: tuple[tuple[str, Any], ...]) -> dict | None:
+    """Build the Pinecone filter expression for a canonical filter key."""
+    clauses = [
+        {k: {"$in": list(v)} if isinstance(v, tuple) else {"$eq": v}}
+        for k, v in key
+    ]
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
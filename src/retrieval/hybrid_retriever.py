@@ -21,8 +21,13 @@ directly into the generation prompt.
 
 from __future__ import annotations
 
+import heapq
 import logging
-from collections import defaultdict
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
 
 from src.config import settings
 from src.retrieval.dense_retriever import DenseRetriever, RetrievedChunk
@@ -35,6 +40,36 @@ logger = logging.getLogger(__name__)
 # k=60 is the standard choice from the original RRF paper.
 _RRF_K = 60
 
+# Comparison-query detection.  Matching is by substring (not whole
+# word), so both lists are compiled into a single alternation that
+# finds every keyword and vehicle mention in one scan of the query.
+_COMPARISON_KEYWORDS = frozenset(['compare', 'vs', 'versus', 'between', 'difference'])
+_VEHICLE_TERMS = {
+    'civic': 'Honda Civic',
+    'camry': 'Toyota Camry',
+    'f-150': 'Ford F-150',
+    'f150': 'Ford F-150',
+    'model 3': 'Tesla Model 3',
+}
+_COMPARISON_TERMS_RE = re.compile("|".join(
+    re.escape(term)
+    for term in sorted([*_COMPARISON_KEYWORDS, *_VEHICLE_TERMS], key=len, reverse=True)
+))
+
+# The reranker only keeps rerank_n results, so it is fed at most
+# rerank_n × this many RRF candidates.
+_RERANK_POOL_FACTOR = 4
+
+# Worker threads for the dense / sparse / rerank fan-out.  All the
+# work is network-bound, so a small pool is plenty.
+_MAX_WORKERS = 8
+
+
+@lru_cache(maxsize=32)
+def _rrf_contributions(n: int) -> tuple[float, ...]:
+    """1 / (k + rank) for ranks 1..n, computed once per list length."""
+    return tuple((1.0 / (_RRF_K + np.arange(1, n + 1, dtype=np.float64))).tolist())
+
 
 class HybridRetriever:
     """Orchestrates the full dense → sparse → RRF → rerank pipeline.
@@ -55,6 +90,9 @@ class HybridRetriever:
         self.dense = DenseRetriever(top_k=self.top_k)
         self.sparse = SparseRetriever(top_k=self.top_k)
         self.reranker = Reranker(top_n=self.rerank_n)
+        self._pool = ThreadPoolExecutor(
+            max_workers=_MAX_WORKERS, thread_name_prefix="hybrid",
+        )
 
     # ── Public interface ──────────────────────────────────────────
 
@@ -66,102 +104,150 @@ class HybridRetriever:
     ) -> list[RetrievedChunk]:
         """Hybrid retrieval with comparison support"""
         
-        # NEW CODE: Detect comparison queries
-        comparison_keywords = ['compare', 'vs', 'versus', 'between', 'difference']
-        is_comparison = any(kw in query.lower() for kw in comparison_keywords)
+        # Detect comparison queries: one regex pass finds every keyword
+        # and vehicle mention in the query.
+        lowered = query.lower()
+        matches = [m.group(0) for m in _COMPARISON_TERMS_RE.finditer(lowered)]
+        is_comparison = any(m in _COMPARISON_KEYWORDS for m in matches)
         
         if is_comparison:
-            # Extract vehicle names
-            vehicles = []
-            vehicle_terms = {
-                'civic': 'Honda Civic',
-                'camry': 'Toyota Camry', 
-                'f-150': 'Ford F-150',
-                'f150': 'Ford F-150',
-                'model 3': 'Tesla Model 3'
-            }
-            
-            for term, full_name in vehicle_terms.items():
-                if term in query.lower():
-                    vehicles.append(full_name)
+            # Vehicle names in order of mention, deduplicated (f-150 / f150)
+            vehicles = list(dict.fromkeys(
+                _VEHICLE_TERMS[m] for m in matches if m in _VEHICLE_TERMS
+            ))
             
             # If we found multiple vehicles, do separate retrievals
             if len(vehicles) >= 2:
+                # Strip vehicle names and comparison keywords in one pass;
+                # the remaining topic is the same for every vehicle
+                topic = _COMPARISON_TERMS_RE.sub('', lowered).strip()
+
+                # Embed all vehicle sub-queries in one call, then fan out
+                vehicle_queries = [f"{topic} {vehicle}" for vehicle in vehicles]
+                vectors = self.dense.embed_many(vehicle_queries)
+                per_vehicle = self._retrieve_many(vehicle_queries, filters, vectors)
+
                 all_results = []
-                topic = query.lower()
-                for vehicle in vehicles:
-                    # Clean up the query
-                    for term in vehicle_terms.keys():
-                        topic = topic.replace(term, '')
-                    for kw in comparison_keywords:
-                        topic = topic.replace(kw, '')
-                    topic = topic.strip()
-                    
-                    # Retrieve for each vehicle
-                    vehicle_query = f"{topic} {vehicle}"
-                    vehicle_results = self._retrieve_single(vehicle_query, filters, top_k=3)
+                for vehicle_results in per_vehicle:
                     all_results.extend(vehicle_results[:2])  # Top 2 from each
-                
+
                 return all_results[:5]  # Return top 5 total
         
         # EXISTING CODE: Normal single retrieval
         return self._retrieve_single(query, filters, top_k)
 
     def _retrieve_single(self, query: str, filters: dict | None = None, top_k: int | None = None):
-        """Original retrieve logic (rename existing retrieve code to this)"""
-        # Move all the existing retrieve() code here
-        # (everything that was in retrieve() before)
-        
-        # ── Step 1 & 2: parallel retrieval ──────────────────────
-        logger.info("HybridRetriever: running dense + sparse retrieval…")
-        dense_results = self.dense.retrieve(query, filters)
-        sparse_results = self.sparse.retrieve(query, filters)
+        """Run the dense → sparse → RRF → rerank pipeline for one query."""
+        return self._retrieve_many([query], filters)[0]
 
-        logger.info(
-            "Dense: %d results | Sparse: %d results",
-            len(dense_results), len(sparse_results),
-        )
-
-        # ── Step 3: RRF merge ───────────────────────────────────
-        merged = self._reciprocal_rank_fusion(dense_results, sparse_results)
-        logger.info("After RRF merge: %d unique candidates.", len(merged))
-
-        # ── Step 4: Cohere reranking ────────────────────────────
-        reranked = self.reranker.rerank(query, merged)
-        logger.info("After reranking: %d final results.", len(reranked))
+    def _retrieve_many(
+        self,
+        queries: list[str],
+        filters: dict | None = None,
+        query_vectors: list[np.ndarray] | None = None,
+    ) -> list[list[RetrievedChunk]]:
+        """Run the full pipeline for several queries concurrently.
+
+        Every dense and sparse call is submitted to the shared thread
+        pool up front, so N queries cost roughly one round-trip of each
+        kind rather than N.  Only leaf calls go to the pool (never a
+        task that itself waits on the pool), which keeps it deadlock-free.
+
+        Args:
+            queries:       Queries to answer.
+            filters:       Metadata filters applied to every query.
+            query_vectors: Optional pre-computed embeddings, one per query.
+
+        Returns:
+            One reranked result list per query, in input order.
+        """
+        vectors = query_vectors or [None] * len(queries)
 
-        return reranked
+        # ── Step 1 & 2: parallel retrieval ──────────────────────
+        logger.info("HybridRetriever: running dense + sparse retrieval for %d queries…", len(queries))
+        dense_futures = [
+            self._pool.submit(self.dense.retrieve, q, filters, v)
+            for q, v in zip(queries, vectors)
+        ]
+        sparse_futures = [
+            self._pool.submit(self.sparse.retrieve, q, filters)
+            for q in queries
+        ]
+
+        rerank_futures = []
+        for query, dense_future, sparse_future in zip(queries, dense_futures, sparse_futures):
+            dense_results = dense_future.result()
+            sparse_results = sparse_future.result()
+            logger.info(
+                "Dense: %d results | Sparse: %d results",
+                len(dense_results), len(sparse_results),
+            )
+
+            # ── Step 3: RRF merge ───────────────────────────────
+            merged = self._reciprocal_rank_fusion(
+                dense_results, sparse_results,
+                limit=self.rerank_n * _RERANK_POOL_FACTOR,
+            )
+            logger.info("After RRF merge: %d unique candidates.", len(merged))
+
+            # ── Step 4: Cohere reranking ────────────────────────
+            rerank_futures.append(self._pool.submit(self.reranker.rerank, query, merged))
+
+        results = [f.result() for f in rerank_futures]
+        logger.info("After reranking: %s final results.", [len(r) for r in results])
+        return results
 
     # ── RRF merger ────────────────────────────────────────────────
     @staticmethod
     def _reciprocal_rank_fusion(
         *result_lists: list[RetrievedChunk],
+        limit: int | None = None,
     ) -> list[RetrievedChunk]:
         """Merge multiple ranked lists via Reciprocal Rank Fusion.
 
-        Documents are keyed by (source_file, chunk_id) so duplicates
-        from dense and sparse are detected and their RRF scores summed.
+        Documents are keyed by their stable chunk_id (the Pinecone
+        vector id) so duplicates from dense and sparse are detected and
+        their RRF scores summed.  Within a single list a chunk counts
+        once, at its best rank.
+
+        Args:
+            limit: Keep only the best *limit* candidates.  Uses a partial
+                   sort, and only the kept candidates are materialised.
 
         Returns candidates sorted by descending RRF score.
         """
-        rrf_scores: dict[str, float] = defaultdict(float)
+        # Each list is capped at top_k (tens of chunks), so this pure-
+        # Python pass costs microseconds next to the retrieval calls.
+        rrf_scores: dict[str, float] = {}
         chunk_map: dict[str, RetrievedChunk] = {}
 
         for ranked_list in result_lists:
-            for rank, chunk in enumerate(ranked_list, start=1):
-                key = chunk.metadata.get("chunk_id") or str(hash(chunk.text))
-                rrf_scores[key] += 1.0 / (_RRF_K + rank)
-                if key not in chunk_map:
-                    chunk_map[key] = chunk
-
-        sorted_keys = sorted(rrf_scores, key=lambda k: rrf_scores[k], reverse=True)
-        merged: list[RetrievedChunk] = []
-        for key in sorted_keys:
-            chunk = chunk_map[key]
-            merged.append(RetrievedChunk(
-                text=chunk.text,
+            contrib = _rrf_contributions(len(ranked_list))
+            seen: set[str] = set()
+            for chunk, weight in zip(ranked_list, contrib):
+                key = chunk.chunk_id
+                if key is None:
+                    # Every indexed vector carries a chunk_id; if one is
+                    # missing, keep the chunk but don't try to merge it.
+                    logger.warning("RRF: chunk without chunk_id from %s",
+                                   chunk.metadata.get("source_file", "unknown source"))
+                    key = f"__anon_{id(chunk)}"
+                elif key in seen:
+                    continue  # a repeat within one list counts at its best rank only
+                seen.add(key)
+                rrf_scores[key] = rrf_scores.get(key, 0.0) + weight
+                chunk_map.setdefault(key, chunk)
+
+        if limit is None:
+            top_keys = sorted(rrf_scores, key=rrf_scores.__getitem__, reverse=True)
+        else:
+            top_keys = heapq.nlargest(limit, rrf_scores, key=rrf_scores.__getitem__)
+
+        return [
+            RetrievedChunk(
+                text=chunk_map[key].text,
                 score=rrf_scores[key],
-                metadata=chunk.metadata,
-            ))
-
-        return merged
+                metadata=chunk_map[key].metadata,
+            )
+            for key in top_keys
+        ]
@@ -23,6 +23,10 @@ from src.retrieval.dense_retriever import RetrievedChunk
 
 logger = logging.getLogger(__name__)
 
+# Cohere bills per document token and the cross-encoder weighs the head
+# of each document most, so only the first ~512 chars are sent.
+_MAX_DOC_CHARS = 512
+
 
 class Reranker:
     """Cohere reranker wrapper.
@@ -30,10 +34,13 @@ class Reranker:
     Args:
         top_n: How many results to keep after reranking
                (default from settings.rerank_top_n).
+        max_doc_chars: Per-document character budget sent to Cohere.
+               Returned chunks always carry their full text.
     """
 
-    def __init__(self, top_n: int | None = None):
+    def __init__(self, top_n: int | None = None, max_doc_chars: int = _MAX_DOC_CHARS):
         self.top_n = top_n or settings.rerank_top_n
+        self.max_doc_chars = max_doc_chars
         self.client = cohere.Client(api_key=settings.cohere_api_key)
         self.model = settings.cohere_rerank_model
 
@@ -57,8 +64,8 @@ class Reranker:
         if not candidates:
             return []
 
-        # Cohere expects a list of document strings
-        documents = [c.text for c in candidates]
+        # Cohere expects a list of document strings; send trimmed heads
+        documents = [self._trim(c.text) for c in candidates]
 
         logger.info(
             "Reranking %d candidates (top_n=%d, model=%s)…",
@@ -89,3 +96,12 @@ class Reranker:
             len(reranked), len(candidates),
         )
         return reranked
+
+    # ── Helpers ───────────────────────────────────────────────────
+    def _trim(self, text: str) -> str:
+        """Cut *text* to max_doc_chars, backing off to a word boundary."""
+        if len(text) <= self.max_doc_chars:
+            return text
+        head = text[:self.max_doc_chars]
+        cut = head.rfind(" ")
+        return head[:cut] if cut > 0 else head
@@ -24,8 +24,12 @@ from __future__ import annotations
 
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from typing import Callable
 
+import numpy as np
 from rank_bm25 import BM25Okapi
 from pinecone import Pinecone
 
@@ -34,11 +38,20 @@ from src.retrieval.dense_retriever import RetrievedChunk
 
 logger = logging.getLogger(__name__)
 
+# Index build: ids per fetch request, and how many requests in flight.
+# Fetch is a GET with ids in the query string, so batches stay small
+# enough to keep URLs short; concurrency hides the per-request latency.
+_FETCH_BATCH = 100
+_FETCH_WORKERS = 16
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
 
 def _tokenise(text: str) -> list[str]:
     """Simple whitespace + punctuation tokeniser for BM25."""
     # Lowercase, split on non-alphanumeric runs
-    return re.findall(r"[a-z0-9]+", text.lower())
+    return _TOKEN_RE.findall(text.lower())
 
 
 class SparseRetriever:
@@ -55,7 +68,15 @@ class SparseRetriever:
 
         # Cache: populated on first call to retrieve()
         self._bm25: BM25Okapi | None = None
-        self._corpus: list[dict] = []  # [{text, metadata}, …]
+        # Corpus stored as parallel lists (struct-of-arrays), indexed the
+        # same way as the BM25 score vector.
+        self._texts: list[str] = []
+        self._metas: list[dict] = []
+        # token → int id; BM25 is fitted on int ids, which hash and
+        # compare faster than variable-length strings.
+        self._vocab: dict[str, int] = {}
+        # Guards the one-time build when queries are fanned out in parallel
+        self._build_lock = threading.Lock()
 
     # ── Public interface ──────────────────────────────────────────
     def retrieve(
@@ -71,36 +92,36 @@ class SparseRetriever:
         """
         self._ensure_index_loaded()
 
-        tokenised_query = _tokenise(query)
+        # Tokens never seen in the corpus score zero, so drop them here
+        tokenised_query = [self._vocab[t] for t in _tokenise(query) if t in self._vocab]
         scores = self._bm25.get_scores(tokenised_query)  # numpy array
 
-        # Pair scores with corpus entries and sort descending
-        scored = sorted(
-            zip(scores, self._corpus),
-            key=lambda pair: pair[0],
-            reverse=True,
-        )
+        # Corpus positions by descending score (stable, so ties keep corpus order)
+        order = np.argsort(-scores, kind="stable")
 
         # Normalise scores to [0, 1]
-        max_score = scored[0][0] if scored and scored[0][0] > 0 else 1.0
+        max_score = scores[order[0]] if len(order) and scores[order[0]] > 0 else 1.0
         results: list[RetrievedChunk] = []
 
-        for raw_score, doc in scored:
+        # Post-filter by metadata.  The active clauses are resolved once
+        # here, and the unfiltered path skips the check entirely.
+        metas = self._metas
+        if filters:
+            matches = self._filter_predicate(filters)
+            order = (i for i in order if matches(metas[i]))
+
+        for i in order:
+            raw_score = scores[i]
             if len(results) >= self.top_k:
                 break
             if raw_score <= 0:
                 break  # remaining scores are zero; nothing useful left
 
-            meta = dict(doc.get("metadata", {}))
-
-            # Post-filter by metadata
-            if filters and not self._matches_filter(meta, filters):
-                continue
-
             results.append(RetrievedChunk(
-                text=doc["text"],
+                text=self._texts[i],
                 score=float(raw_score / max_score),
-                metadata=meta,
+                # Shared with the corpus, not copied — callers only read it
+                metadata=metas[i],
             ))
 
         logger.info("BM25 retrieval returned %d results.", len(results))
@@ -117,6 +138,12 @@ class SparseRetriever:
         if self._bm25 is not None:
             return  # already cached
 
+        with self._build_lock:
+            if self._bm25 is None:  # another thread may have built it meanwhile
+                self._build_index()
+
+    def _build_index(self) -> None:
+        """Bulk-fetch the corpus from Pinecone and fit BM25 over it."""
         logger.info("Building in-memory BM25 index from Pinecone…")
         index = self.pc.Index(self._index_name)
 
@@ -127,33 +154,61 @@ class SparseRetriever:
 
         if not all_ids:
             logger.warning("Pinecone index is empty; BM25 index will be empty.")
-            self._corpus = []
+            self._texts, self._metas = [], []
             self._bm25 = BM25Okapi([[]])
             return
 
-        # Fetch in batches of 1000
-        corpus: list[dict] = []
-        batch_size = 100
-        for i in range(0, len(all_ids), batch_size):
-            batch_ids = all_ids[i: i + batch_size]
-            fetched = index.fetch(ids=batch_ids)
-            for vec_id, vec_data in fetched.vectors.items():
-                meta = dict(vec_data.metadata) if vec_data.metadata else {}
-                text = meta.pop("text", "")
-                corpus.append({"text": text, "metadata": meta})
-
-        self._corpus = corpus
-        tokenised_corpus = [_tokenise(doc["text"]) for doc in corpus]
+        # Fetch batches concurrently; pool.map yields responses in batch
+        # order, so the corpus is assembled on this thread without locking.
+        batches = [all_ids[i: i + _FETCH_BATCH] for i in range(0, len(all_ids), _FETCH_BATCH)]
+        texts: list[str] = []
+        metas: list[dict] = []
+        with ThreadPoolExecutor(max_workers=_FETCH_WORKERS) as pool:
+            for fetched in pool.map(lambda ids: index.fetch(ids=ids), batches):
+                for vec_id, vec_data in fetched.vectors.items():
+                    meta = dict(vec_data.metadata) if vec_data.metadata else {}
+                    text = meta.pop("text", "")
+                    meta.setdefault("chunk_id", vec_id)  # vector id == chunk_id
+                    texts.append(text)
+                    metas.append(meta)
+
+        vocab: dict[str, int] = {}
+        tokenised_corpus = [
+            [vocab.setdefault(tok, len(vocab)) for tok in _tokenise(text)]
+            for text in texts
+        ]
+        self._texts = texts
+        self._metas = metas
+        self._vocab = vocab
         self._bm25 = BM25Okapi(tokenised_corpus)
 
-        logger.info("BM25 index built: %d documents.", len(corpus))
+        logger.info("BM25 index built: %d documents, %d distinct terms.", len(texts), len(vocab))
 
     # ── Filter helper ─────────────────────────────────────────────
+    @staticmethod
+    def _filter_predicate(filters: dict) -> Callable[[dict], bool]:
+        """Compile the active filters into a metadata → bool test.
+
+        Scalar values must match exactly; a list value matches any of
+        its items (the $in the dense side sends to Pinecone).  When all
+        values are scalars the test is a single subset check against
+        ``metadata.items()``.
+        """
+        active = [
+            (key, filters[key])
+            for key in ("make", "model", "year", "subsystem")
+            if filters.get(key) is not None
+        ]
+        try:
+            required = frozenset(active)
+        except TypeError:  # a list (any-of) or other unhashable value
+            return lambda metadata: all(
+                metadata.get(k) in v if isinstance(v, list) else metadata.get(k) == v
+                for k, v in active
+            )
+        return lambda metadata: required <= metadata.items()
+
     @staticmethod
     def _matches_filter(metadata: dict, filters: dict) -> bool:
         """Return True if metadata satisfies all active filters."""
-        for key in ("make", "model", "year", "subsystem"):
-            if key in filters and filters[key] is not None:
-                if metadata.get(key) != filters[key]:
-                    return False
-        return True
+        return SparseRetriever._filter_predicate(filters)(metadata)
@@ -3,7 +3,7 @@ Streamlit web interface for AutomotiveGPT.
 
 Features:
   - Sidebar: vehicle filter dropdowns (make, model, year, subsystem)
-  - Chat area: message bubbles with live spinner during generation
+  - Chat area: message bubbles; answers stream in token by token
   - Source cards: expandable citation blocks below each answer
   - Conversation controls: new / clear conversation
   - Dark theme with custom CSS
@@ -11,23 +11,39 @@ Features:
 The UI calls the FastAPI backend over HTTP so it can run independently.
 """
 
+import atexit
+import json
 import uuid
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
 
+import jinja2
+import pandas as pd
 import streamlit as st
 import requests
+from streamlit.errors import StreamlitAPIException
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
 # ── Configuration ─────────────────────────────────────────────────────
 API_BASE = "http://localhost:8000/api/v1"
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+STATIC_DIR = Path(__file__).parent / "static"
 
 DEFAULT_MAKES = ["All", "Honda", "Toyota", "Ford", "Chevrolet", "BMW",
                  "Mercedes-Benz", "Tesla", "Hyundai", "Nissan",
                  "Volkswagen", "Audi", "Lexus", "Jeep"]
-DEFAULT_SUBSYSTEMS = ["All", "Engine", "Transmission", "Brake", "Electrical",
-                      "Steering", "Suspension", "Fuel", "Exhaust", "HVAC",
-                      "Battery", "Charging", "Cooling"]
+# (label, filter value) — the value is what the API expects, so nothing
+# has to be lower-cased per rerun.
+DEFAULT_SUBSYSTEMS = [("All", None)] + [
+    (name, name.lower())
+    for name in ("Engine", "Transmission", "Brake", "Electrical", "Steering",
+                 "Suspension", "Fuel", "Exhaust", "HVAC", "Battery",
+                 "Charging", "Cooling")
+]
 
 
 # ── Page config & CSS ─────────────────────────────────────────────────
@@ -38,70 +54,156 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-st.markdown("""
-<style>
-    .stApp { background: #0f1117; color: #e2e8f0; font-family: 'Segoe UI', system-ui, sans-serif; }
-    .main .block-container { padding-top: 1rem; max-width: 900px; }
-    .chat-user {
-        background: #1e3a5f; border-radius: 12px 12px 4px 12px;
-        padding: 12px 16px; margin: 8px 0 8px auto; max-width: 85%;
-        text-align: right; color: #e2e8f0;
-    }
-    .chat-assistant {
-        background: #1a1d2e; border: 1px solid #2a2d3e;
-        border-radius: 12px 12px 12px 4px; padding: 12px 16px;
-        margin: 8px 0; max-width: 90%; color: #e2e8f0; line-height: 1.6;
-    }
-    .source-card {
-        background: #161829; border: 1px solid #2a2d3e; border-radius: 8px;
-        padding: 10px 14px; margin: 4px 0; font-size: 0.85rem; color: #94a3b8;
-    }
-    .source-card .src-hdr { color: #60a5fa; font-weight: 600; margin-bottom: 4px; }
-    .conf-badge {
-        display: inline-block; background: #1e3a5f; color: #60a5fa;
-        border-radius: 20px; padding: 2px 10px; font-size: 0.78rem; margin-left: 8px;
-    }
-</style>
-""", unsafe_allow_html=True)
+
+@st.cache_resource
+def _css() -> str:
+    """The stylesheet, read from static/chat.css once per process."""
+    return f"<style>\n{(STATIC_DIR / 'chat.css').read_text()}</style>"
+
+
+# Streamlit drops any element a rerun does not re-emit, so the <style>
+# block is written every run; only the file read is cached.  (Linking
+# /app/static/chat.css instead would not work: Streamlit's static
+# handler serves .css as text/plain, which browsers refuse as a
+# stylesheet.)
+st.markdown(_css(), unsafe_allow_html=True)
 
 
 # ── Session state ─────────────────────────────────────────────────────
+_STATE_DEFAULTS = {
+    "conversation_id": lambda: None,
+    "_conv_id_short": lambda: None,  # sidebar caption, set with conversation_id
+    "session_id": lambda: uuid.uuid4().hex,
+    "messages": list,
+    "_filters_payload": lambda: None,  # /chat "filters" field, rebuilt on change
+    "pending_reset": lambda: None,  # conversation to delete with the next /chat
+    "pending_turn": lambda: None,  # {"message", "idempotency_key"} until answered
+}
+
+
 def _init():
-    for k, v in {
-        "conversation_id": None,
-        "session_id": str(uuid.uuid4()),
-        "messages": [],
-        "filters": {},
-    }.items():
-        st.session_state.setdefault(k, v)
+    # Factories, so nothing (notably uuid4's entropy read) runs on reruns
+    # where the key already exists.
+    for k, make in _STATE_DEFAULTS.items():
+        if k not in st.session_state:
+            st.session_state[k] = make()
 
 _init()
 
 
 # ── API helpers ───────────────────────────────────────────────────────
-def _api_chat(message: str) -> dict:
-    filters = {k: v for k, v in st.session_state["filters"].items() if v and v != "All"} or None
+@st.cache_resource
+def _http() -> requests.Session:
+    """Pooled keep-alive HTTP session shared across reruns.
+
+    Streamlit re-executes this script on every interaction, so a plain
+    module-level Session would be rebuilt (and its connections dropped)
+    each time; cache_resource keeps one per process.  Retries cover
+    transient 5xx on idempotent requests only — POST /chat is never
+    replayed.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=8,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    atexit.register(session.close)
+    return session
+
+
+def _api_chat(message: str, placeholder, idempotency_key: str) -> dict:
+    """Stream one turn from /chat/stream, painting tokens into *placeholder*.
+
+    Conversation creation and a pending "Clear" are folded into the same
+    request (create_if_missing / reset), so neither costs its own round
+    trip.  *idempotency_key* is fixed per question, so resending it after
+    a failure replays the server's answer if the first attempt got through.
+    Returns the final response payload (answer, sources, confidence, …).
+    """
     payload = {
         "message": message,
         "session_id": st.session_state["session_id"],
-        "filters": filters,
+        "filters": st.session_state["_filters_payload"],
     }
     if st.session_state["conversation_id"]:
         payload["conversation_id"] = st.session_state["conversation_id"]
-    resp = requests.post(f"{API_BASE}/chat", json=payload, timeout=30)
-    resp.raise_for_status()
-    return resp.json()
+    elif st.session_state["pending_reset"]:
+        payload["conversation_id"] = st.session_state["pending_reset"]
+        payload["reset"] = True
+    else:
+        payload["create_if_missing"] = True
+    headers = {"Idempotency-Key": idempotency_key}
+
+    text, final = "", None
+    with _http().post(f"{API_BASE}/chat/stream", json=payload, headers=headers,
+                      stream=True, timeout=30) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if not line.startswith(b"data:"):
+                continue
+            event = json.loads(line[5:])
+            if "delta" in event:
+                text += event["delta"]
+                placeholder.markdown(str(_chat_macros().assistant_bubble(text)), unsafe_allow_html=True)
+            elif "detail" in event:
+                raise RuntimeError(event["detail"])
+            else:
+                final = event
+    if final is None:
+        raise RuntimeError("Answer stream ended before the final response.")
+    st.session_state["pending_reset"] = None
+    return final
+
+
+@st.cache_resource
+def _background() -> ThreadPoolExecutor:
+    """Small worker pool for API calls that can overlap page rendering."""
+    pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agpt-ui")
+    atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+    return pool
+
+
+def _fetch_health(session: requests.Session) -> dict:
+    # Runs on a worker thread — must not touch Streamlit APIs.
+    try:
+        return session.get(f"{API_BASE}/health", timeout=5).json()
+    except Exception:
+        return {"status": "unreachable", "redis": False, "db": False}
 
 
-def _api_delete(conv_id: str) -> bool:
-    return requests.delete(f"{API_BASE}/conversations/{conv_id}", timeout=10).status_code == 200
+@st.cache_resource(ttl=5, show_spinner=False)
+def _api_health_async() -> Future:
+    """Start the health probe in the background; resolve with .result().
+
+    The Future itself is cached for a few seconds so that widget
+    interactions (each one a full rerun) reuse the last probe instead of
+    hitting /health again.
+    """
+    return _background().submit(_fetch_health, _http())
 
 
 def _api_health() -> dict:
+    return _api_health_async().result()
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _api_vehicles() -> list[str]:
+    """Make dropdown options from /vehicles, falling back to DEFAULT_MAKES."""
     try:
-        return requests.get(f"{API_BASE}/health", timeout=5).json()
+        resp = _http().get(f"{API_BASE}/vehicles", timeout=5)
+        resp.raise_for_status()
+        makes = sorted({v["make"] for v in resp.json() if v.get("make")})
     except Exception:
-        return {"status": "unreachable", "redis": False, "db": False}
+        return DEFAULT_MAKES
+    return ["All", *makes] if makes else DEFAULT_MAKES
+
+
+# Kick off the health probe now so its round-trip overlaps rendering
+# of the sidebar and chat history; the status line is filled in last.
+_health_future = _api_health_async()
 
 
 # ── Sidebar ───────────────────────────────────────────────────────────
@@ -111,91 +213,185 @@ with st.sidebar:
     st.divider()
 
     st.markdown("### 🔍 Vehicle Filters")
-    make = st.selectbox("Make", DEFAULT_MAKES, key="sb_make")
-    subsys = st.selectbox("Subsystem", DEFAULT_SUBSYSTEMS, key="sb_subsys")
+    make = st.selectbox("Make", _api_vehicles(), key="sb_make")
+    _, subsys = st.selectbox("Subsystem", DEFAULT_SUBSYSTEMS, format_func=lambda o: o[0], key="sb_subsys")
     y1, y2 = st.columns(2)
     year_min = y1.number_input("Year (from)", 1990, 2025, 2020, key="sb_ymin")
     year_max = y2.number_input("Year (to)", 1990, 2025, 2025, key="sb_ymax")
 
-    st.session_state["filters"] = {
-        "make": make if make != "All" else None,
-        "subsystem": subsys.lower() if subsys != "All" else None,
-    }
+    filter_key = (make, subsys)
+    if st.session_state.get("_f_key") != filter_key:
+        st.session_state["_f_key"] = filter_key
+        st.session_state["_filters_payload"] = {
+            k: v for k, v in (("make", make if make != "All" else None), ("subsystem", subsys)) if v
+        } or None
 
     st.divider()
     st.markdown("### 💬 Conversation")
     if st.button("➕ New Conversation", use_container_width=True):
-        st.session_state.update(conversation_id=None, messages=[])
+        st.session_state.update(conversation_id=None, _conv_id_short=None, messages=[], pending_turn=None)
         st.rerun()
 
     if st.session_state["conversation_id"]:
-        st.caption(f"ID: `{st.session_state['conversation_id'][:16]}…`")
+        st.caption(st.session_state["_conv_id_short"])
         if st.button("🗑️ Clear", use_container_width=True):
-            _api_delete(st.session_state["conversation_id"])
-            st.session_state.update(conversation_id=None, messages=[])
+            # Deleted server-side by the next /chat (reset=True), not here.
+            st.session_state.update(
+                pending_reset=st.session_state["conversation_id"],
+                pending_turn=None,
+                conversation_id=None,
+                _conv_id_short=None,
+                messages=[],
+            )
             st.rerun()
 
     st.divider()
     st.markdown("### ⚡ Status")
-    h = _api_health()
-    st.markdown(
-        f"API: {'🟢' if h['status'] == 'ok' else '🔴'} | "
-        f"Redis: {'🟢' if h.get('redis') else '🔴'} | "
-        f"DB: {'🟢' if h.get('db') else '🔴'}"
-    )
+    status_slot = st.empty()  # filled once the background probe resolves
+
+
+# ── Message HTML (built once, when a message is appended) ─────────────
+@st.cache_resource
+def _chat_macros():
+    """Macros from templates/chat.html, compiled once per process.
+
+    Autoescaping keeps model output and file names from injecting markup
+    into the unsafe_allow_html blocks they are written into.
+    """
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATE_DIR), autoescape=True)
+    return env.get_template("chat.html").module
+
+
+def _user_message(content: str) -> dict:
+    return {
+        "role": "user",
+        "content": content,
+        "_html_bubble": str(_chat_macros().user_bubble(content)),
+    }
+
+
+def _assistant_message(result: dict) -> dict:
+    """Build an assistant message with its bubble/source HTML precomputed,
+    so reruns only concatenate strings."""
+    macros = _chat_macros()
+    conf = result.get("confidence", 0)
+    sources = result.get("sources", [])
+    msg = {
+        "role": "assistant",
+        "content": result["answer"],
+        "confidence": conf,
+        "sources": sources,
+        "_html_bubble": str(macros.assistant_bubble(result["answer"], conf)),
+    }
+    if sources:
+        msg["_html_sources"] = str(macros.source_details(sources))
+        msg["_sources_df"] = pd.DataFrame([{
+            "#": s["source_id"],
+            "file": s["source_file"],
+            "page": s.get("page") or "—",
+            "type": s.get("section_type") or "—",
+            "score": f'{s.get("score", 0):.2f}',
+        } for s in sources])
+    return msg
 
 
 # ── Chat area ─────────────────────────────────────────────────────────
 st.markdown("## 💬 Ask a Question")
 st.caption("Ask anything about vehicle service, repair procedures, or specs.")
 
-# Render history
-for msg in st.session_state["messages"]:
-    if msg["role"] == "user":
-        st.markdown(f'<div class="chat-user">{msg["content"]}</div>', unsafe_allow_html=True)
-    else:
-        conf = msg.get("confidence", 0)
-        badge = f'<span class="conf-badge">Confidence: {conf:.0%}</span>'
-        st.markdown(
-            f'<div class="chat-assistant">{msg["content"]} {badge}</div>',
-            unsafe_allow_html=True,
-        )
-        sources = msg.get("sources", [])
-        if sources:
-            with st.expander(f"📄 Sources ({len(sources)})", expanded=False):
-                for s in sources:
-                    pg = f"Page {s['page']}" if s.get("page") else "—"
-                    st.markdown(
-                        f'<div class="source-card">'
-                        f'<div class="src-hdr">[Source {s["source_id"]}] {s["source_file"]}</div>'
-                        f'{pg} · {s.get("section_type","—")} · score {s.get("score",0):.2f}'
-                        f'</div>',
-                        unsafe_allow_html=True,
-                    )
-
-# ── Input ─────────────────────────────────────────────────────────────
-user_input = st.chat_input("Ask about a vehicle service procedure…")
-
-if user_input:
-    st.session_state["messages"].append({"role": "user", "content": user_input})
-
-    with st.spinner("🔍 Searching manuals and generating answer…"):
-        try:
-            result = _api_chat(user_input)
-            st.session_state["conversation_id"] = result["conversation_id"]
-            st.session_state["messages"].append({
-                "role": "assistant",
-                "content": result["answer"],
-                "confidence": result.get("confidence", 0),
-                "sources": result.get("sources", []),
-            })
-            cached = " (cached)" if result.get("cached") else ""
-            st.caption(f"⏱️ {result.get('latency_ms', 0)} ms{cached}")
-        except requests.exceptions.ConnectionError:
-            st.error("❌ API server unreachable. Start FastAPI on port 8000.")
-            st.session_state["messages"].pop()
-        except Exception as e:
-            st.error(f"❌ {e}")
-            st.session_state["messages"].pop()
-
-    st.rerun()
+@st.fragment
+def _chat_fragment():
+    """History + chat input.
+
+    Submitting a question reruns only this fragment, not the sidebar,
+    CSS or health probe.  The full app reruns only when a new
+    conversation id has to reach the sidebar caption.
+    """
+    # Render history — one markdown write for the whole transcript.  Only
+    # the latest answer gets an interactive expander (a single dataframe);
+    # older source lists are flattened to <details> in the same block.
+    messages = st.session_state["messages"]
+    latest = messages[-1] if messages and messages[-1]["role"] == "assistant" else None
+
+    parts = []
+    for msg in messages:
+        parts.append(msg["_html_bubble"])
+        if msg is not latest and "_html_sources" in msg:
+            parts.append(msg["_html_sources"])
+    if parts:
+        st.markdown("\n".join(parts), unsafe_allow_html=True)
+
+    if latest and "_sources_df" in latest:
+        with st.expander(f"📄 Sources ({len(latest['sources'])})", expanded=False):
+            st.dataframe(latest["_sources_df"], hide_index=True, use_container_width=True)
+
+    # ── Input ─────────────────────────────────────────────────────
+    user_input = st.chat_input("Ask about a vehicle service procedure…")
+    pending = st.session_state["pending_turn"]
+    if pending and st.button("↻ Resend last question"):
+        user_input = pending["message"]
+    if not user_input:
+        return
+
+    # Fail fast on the (TTL-cached) health probe rather than paying for a
+    # connection attempt that is known to fail.
+    if _api_health()["status"] == "unreachable":
+        st.error("❌ API server unreachable. Start FastAPI on port 8000.")
+        return
+
+    # One Idempotency-Key per question, kept until it is answered: a
+    # resend after a failure reuses it instead of minting a new one.
+    if not pending or pending["message"] != user_input:
+        pending = {
+            "message": user_input,
+            "idempotency_key": f"{st.session_state['session_id']}-{uuid.uuid4().hex}",
+        }
+        st.session_state["pending_turn"] = pending
+
+    user_msg = _user_message(user_input)
+    st.session_state["messages"].append(user_msg)
+    st.markdown(user_msg["_html_bubble"], unsafe_allow_html=True)
+
+    answer_slot = st.empty()
+    answer_slot.caption("🔍 Searching manuals and generating answer…")
+    new_conversation = False
+    try:
+        result = _api_chat(user_input, answer_slot, pending["idempotency_key"])
+        st.session_state["pending_turn"] = None
+        conv_id = result["conversation_id"]
+        if conv_id != st.session_state["conversation_id"]:
+            st.session_state["conversation_id"] = conv_id
+            st.session_state["_conv_id_short"] = f"ID: `{conv_id[:16]}…`"
+            new_conversation = True
+        st.session_state["messages"].append(_assistant_message(result))
+        cached = " (cached)" if result.get("cached") else ""
+        st.caption(f"⏱️ {result.get('latency_ms', 0)} ms{cached}")
+    except requests.exceptions.ConnectionError:
+        answer_slot.empty()
+        st.error("❌ API server unreachable. Start FastAPI on port 8000.")
+        st.session_state["messages"].pop()
+    except Exception as e:
+        answer_slot.empty()
+        st.error(f"❌ {e}")
+        st.session_state["messages"].pop()
+
+    if new_conversation:
+        st.rerun()
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # Fragment-scoped reruns are only allowed while the fragment runs
+        # on its own; if this turn arrived on a full-script run, rerun it all.
+        st.rerun()
+
+
+_chat_fragment()
+
+
+# ── Status (resolved last so the probe overlaps rendering) ────────────
+h = _health_future.result()
+status_slot.markdown(
+    f"API: {'🟢' if h['status'] == 'ok' else '🔴'} | "
+    f"Redis: {'🟢' if h.get('redis') else '🔴'} | "
+    f"DB: {'🟢' if h.get('db') else '🔴'}"
+)
@@ -1,20 +1,54 @@
-
-import os
-from dotenv import load_dotenv
-from pinecone import Pinecone
-
-load_dotenv()
-
-pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
-index = pc.Index('automotive-manuals')
-stats = index.describe_index_stats()
-
-print('=' * 60)
-print('PINECONE INDEX VERIFICATION')
-print('=' * 60)
-print(f'Total vectors: {stats.total_vector_count}')
-print(f'Dimension: {stats.dimension}')
-print(f'Index fullness: {stats.index_fullness:.2%}')
-print('=' * 60)
-print('SUCCESS! Your data is in Pinecone.')
-print('=' * 60)
+import os
+import sys
+import time
+from functools import lru_cache
+
+from dotenv import load_dotenv
+from pinecone import Pinecone
+
+load_dotenv()
+
+INDEX_NAME = 'automotive-manuals'
+PINECONE_STATS_TTL = float(os.getenv('PINECONE_STATS_TTL', '30'))
+
+
+@lru_cache(maxsize=None)
+def get_client() -> Pinecone:
+    # One client per process so repeated probes reuse its keep-alive pool.
+    return Pinecone(api_key=os.getenv('PINECONE_API_KEY'), pool_threads=4)
+
+
+@lru_cache(maxsize=None)
+def get_index(name: str = INDEX_NAME):
+    return get_client().Index(name)
+
+
+_stats_cache: dict[str, tuple[float, object]] = {}
+
+
+def describe_stats(name: str = INDEX_NAME):
+    """describe_index_stats(), reused for PINECONE_STATS_TTL seconds."""
+    now = time.monotonic()
+    hit = _stats_cache.get(name)
+    if hit and now - hit[0] < PINECONE_STATS_TTL:
+        return hit[1]
+    stats = get_index(name).describe_index_stats()
+    _stats_cache[name] = (now, stats)
+    return stats
+
+
+if __name__ == '__main__':
+    stats = describe_stats()
+
+    rule = '=' * 60
+    sys.stdout.write(
+        f'{rule}\n'
+        'PINECONE INDEX VERIFICATION\n'
+        f'{rule}\n'
+        f'Total vectors: {stats.total_vector_count}\n'
+        f'Dimension: {stats.dimension}\n'
+        f'Index fullness: {stats.index_fullness:.2%}\n'
+        f'{rule}\n'
+        'SUCCESS! Your data is in Pinecone.\n'
+        f'{rule}\n'
+    )
@@ -1,10 +1,13 @@
 """Tests for src/api/main.py — FastAPI endpoints."""
 
+from contextlib import ExitStack
 from unittest.mock import patch, MagicMock, AsyncMock
 
 import pytest
 from fastapi.testclient import TestClient
 
+from src.generation.generator import GenerationResult
+
 # We need to mock heavy dependencies before importing the app
 # so they don't try to connect to real services at import time.
 _patches = [
@@ -16,23 +19,49 @@ _patches = [
 ]
 
 
+@pytest.fixture(scope="module")
+def patched_deps():
+    """Apply all patches once for this module."""
+    with ExitStack() as stack:
+        yield [stack.enter_context(p) for p in _patches]
+
+
 @pytest.fixture(autouse=True)
-def mock_deps():
-    """Start all patches before each test, stop after."""
-    started = [p.start() for p in _patches]
-    yield started
-    for p in _patches:
-        p.stop()
+def mock_deps(patched_deps):
+    """Hand each test the shared mocks, cleared of recorded calls afterwards."""
+    yield patched_deps
+    for m in patched_deps:
+        m.reset_mock()
 
 
-@pytest.fixture
-def client():
-    """Create a fresh TestClient, triggering the startup event."""
+@pytest.fixture(scope="module")
+def client(patched_deps):
+    """One TestClient (and one startup event) shared by the module.
+
+    Per-test state (_store, _retriever, _generator, cache hooks) is set
+    with monkeypatch so it is undone after each test.
+    """
     from src.api.main import app
     with TestClient(app) as c:
         yield c
 
 
+@pytest.fixture(scope="module")
+def torque_result():
+    return GenerationResult(
+        answer="The torque spec is 25 N·m.",
+        confidence=0.85,
+        sources=[{"source_id": 1, "source_file": "test.pdf", "page": 10, "section_type": "paragraph", "score": 0.9}],
+        latency_ms=1500,
+        usage={"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+    )
+
+
+@pytest.fixture(scope="module")
+def follow_up_result():
+    return GenerationResult(answer="Follow-up answer.", confidence=0.7, latency_ms=800)
+
+
 # ── Health endpoint ───────────────────────────────────────────────────
 class TestHealth:
     def test_health_returns_200(self, client):
@@ -50,33 +79,30 @@ class TestChatEndpoint:
         resp = client.post("/api/v1/chat", json={"session_id": "s1"})
         assert resp.status_code == 422  # validation error — message is required
 
-    def test_chat_returns_answer(self, client):
+    def test_chat_rejects_operator_filters(self, client):
+        resp = client.post("/api/v1/chat", json={"message": "Hi", "filters": {"year": {"$gte": 2020}}})
+        assert resp.status_code == 422
+
+    def test_chat_returns_answer(self, client, monkeypatch, torque_result):
         from src.api import main as api_main
 
         # Wire up mocks
         mock_store = MagicMock()
         mock_store.create.return_value = "conv-123"
         mock_store.get_history_for_prompt.return_value = []
-        api_main._store = mock_store
+        monkeypatch.setattr(api_main, "_store", mock_store)
 
         mock_retriever = MagicMock()
         mock_retriever.retrieve.return_value = []  # empty context
-        api_main._retriever = mock_retriever
-
-        mock_gen_result = MagicMock()
-        mock_gen_result.answer = "The torque spec is 25 N·m."
-        mock_gen_result.confidence = 0.85
-        mock_gen_result.sources = [{"source_id": 1, "source_file": "test.pdf", "page": 10, "section_type": "paragraph", "score": 0.9}]
-        mock_gen_result.latency_ms = 1500
-        mock_gen_result.usage = {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150}
+        monkeypatch.setattr(api_main, "_retriever", mock_retriever)
 
         mock_generator = MagicMock()
-        mock_generator.generate.return_value = mock_gen_result
-        api_main._generator = mock_generator
+        mock_generator.generate.return_value = torque_result
+        monkeypatch.setattr(api_main, "_generator", mock_generator)
 
         # Mock Redis cache miss
-        api_main._cache_get = lambda key: None
-        api_main._cache_set = lambda key, val: None
+        monkeypatch.setattr(api_main, "_cache_get", lambda key: None)
+        monkeypatch.setattr(api_main, "_cache_set", lambda key, val: None)
 
         resp = client.post("/api/v1/chat", json={
             "session_id": "test-session",
@@ -91,7 +117,7 @@ class TestChatEndpoint:
         assert data["confidence"] == 0.85
         assert len(data["sources"]) == 1
 
-    def test_chat_resumes_existing_conversation(self, client):
+    def test_chat_resumes_existing_conversation(self, client, monkeypatch, follow_up_result):
         from src.api import main as api_main
 
         mock_store = MagicMock()
@@ -99,25 +125,18 @@ class TestChatEndpoint:
             {"role": "user", "content": "Previous Q"},
             {"role": "assistant", "content": "Previous A"},
         ]
-        api_main._store = mock_store
+        monkeypatch.setattr(api_main, "_store", mock_store)
 
         mock_retriever = MagicMock()
         mock_retriever.retrieve.return_value = []
-        api_main._retriever = mock_retriever
-
-        mock_gen_result = MagicMock()
-        mock_gen_result.answer = "Follow-up answer."
-        mock_gen_result.confidence = 0.7
-        mock_gen_result.sources = []
-        mock_gen_result.latency_ms = 800
-        mock_gen_result.usage = {}
+        monkeypatch.setattr(api_main, "_retriever", mock_retriever)
 
         mock_generator = MagicMock()
-        mock_generator.generate.return_value = mock_gen_result
-        api_main._generator = mock_generator
+        mock_generator.generate.return_value = follow_up_result
+        monkeypatch.setattr(api_main, "_generator", mock_generator)
 
-        api_main._cache_get = lambda key: None
-        api_main._cache_set = lambda key, val: None
+        monkeypatch.setattr(api_main, "_cache_get", lambda key: None)
+        monkeypatch.setattr(api_main, "_cache_set", lambda key, val: None)
 
         resp = client.post("/api/v1/chat", json={
             "session_id": "s1",
@@ -130,20 +149,165 @@ class TestChatEndpoint:
         call_kwargs = mock_generator.generate.call_args[1]
         assert len(call_kwargs["conversation_history"]) == 2
 
+    def test_chat_reset_replaces_conversation_in_one_request(self, client, monkeypatch, follow_up_result):
+        from src.api import main as api_main
+
+        mock_store = MagicMock()
+        mock_store.create.return_value = "conv-new"
+        monkeypatch.setattr(api_main, "_store", mock_store)
+        monkeypatch.setattr(api_main, "_retriever", MagicMock(retrieve=MagicMock(return_value=[])))
+        monkeypatch.setattr(api_main, "_generator", MagicMock(generate=MagicMock(return_value=follow_up_result)))
+        monkeypatch.setattr(api_main, "_cache_get", lambda key: None)
+        monkeypatch.setattr(api_main, "_cache_set", lambda key, val: None)
+
+        resp = client.post("/api/v1/chat", json={
+            "session_id": "s1",
+            "conversation_id": "old-conv",
+            "reset": True,
+            "message": "Start over",
+        })
+
+        assert resp.status_code == 200
+        assert resp.json()["conversation_id"] == "conv-new"
+        mock_store.delete.assert_called_once_with("old-conv")
+        mock_store.get_history_for_prompt.assert_not_called()
+
+    def test_chat_reset_without_create_is_rejected_before_delete(self, client, monkeypatch):
+        from src.api import main as api_main
+
+        mock_store = MagicMock()
+        monkeypatch.setattr(api_main, "_store", mock_store)
+
+        resp = client.post("/api/v1/chat", json={
+            "conversation_id": "c1",
+            "reset": True,
+            "create_if_missing": False,
+            "message": "Start over",
+        })
+
+        assert resp.status_code == 422
+        assert "reset" in resp.json()["detail"]
+        mock_store.delete.assert_not_called()
+
+    def test_chat_unknown_conversation_without_create_is_404(self, client, monkeypatch):
+        from src.api import main as api_main
+
+        mock_store = MagicMock()
+        mock_store.get_history_for_prompt.return_value = []
+        mock_store.exists.return_value = False
+        monkeypatch.setattr(api_main, "_store", mock_store)
+
+        resp = client.post("/api/v1/chat", json={
+            "conversation_id": "gone",
+            "create_if_missing": False,
+            "message": "Hello?",
+        })
+
+        assert resp.status_code == 404
+        mock_store.create.assert_not_called()
+
+    def test_chat_idempotency_key_replays_response(self, client, monkeypatch):
+        from src.api import main as api_main
+
+        stored = {
+            "conversation_id": "conv-1", "answer": "Once.", "confidence": 0.9,
+            "sources": [], "latency_ms": 5, "cached": False,
+        }
+        mock_generator = MagicMock()
+        monkeypatch.setattr(api_main, "_generator", mock_generator)
+        monkeypatch.setattr(api_main, "_idempotent_claim", lambda key: stored if key == "k-1" else None)
+
+        resp = client.post(
+            "/api/v1/chat",
+            json={"message": "Retry me"},
+            headers={"Idempotency-Key": "k-1"},
+        )
+
+        assert resp.status_code == 200
+        assert resp.json()["answer"] == "Once."
+        mock_generator.generate.assert_not_called()
+
+    def test_chat_duplicate_while_first_runs_is_409(self, client, monkeypatch):
+        from src.api import main as api_main
+
+        # SET NX loses: another request holds the key and has stored nothing yet
+        redis_mock = MagicMock()
+        redis_mock.set.return_value = False
+        redis_mock.get.return_value = api_main._IN_FLIGHT
+        monkeypatch.setattr(api_main, "_redis", redis_mock)
+        mock_generator = MagicMock()
+        monkeypatch.setattr(api_main, "_generator", mock_generator)
+
+        resp = client.post("/api/v1/chat", json={"message": "Twice"}, headers={"Idempotency-Key": "k-2"})
+
+        assert resp.status_code == 409
+        assert redis_mock.set.call_args[1]["nx"] is True
+        mock_generator.generate.assert_not_called()
+
+    def test_chat_failure_releases_idempotency_claim(self, client, monkeypatch):
+        from src.api import main as api_main
+
+        redis_mock = MagicMock()
+        redis_mock.set.return_value = True
+        monkeypatch.setattr(api_main, "_redis", redis_mock)
+        monkeypatch.setattr(api_main, "_store", MagicMock(get_history_for_prompt=MagicMock(return_value=[])))
+        monkeypatch.setattr(api_main, "_cache_get", lambda key: None)
+        monkeypatch.setattr(api_main, "_retriever", MagicMock(retrieve=MagicMock(side_effect=RuntimeError("down"))))
+
+        with pytest.raises(RuntimeError):
+            client.post("/api/v1/chat", json={"message": "Hi"}, headers={"Idempotency-Key": "k-3"})
+
+        redis_mock.delete.assert_called_once_with(api_main._idempotency_key("k-3"))
+
+    def test_chat_stream_emits_deltas_then_final_payload(self, client, monkeypatch):
+        import json
+        from src.api import main as api_main
+
+        mock_store = MagicMock()
+        mock_store.create.return_value = "conv-s"
+        monkeypatch.setattr(api_main, "_store", mock_store)
+        monkeypatch.setattr(api_main, "_retriever", MagicMock(retrieve=MagicMock(return_value=[])))
+
+        class _Stream:
+            full_text = "25 N·m."
+
+            def __iter__(self):
+                yield from ["25 ", "N·m."]
+
+        mock_generator = MagicMock()
+        mock_generator.stream.return_value = _Stream()
+        mock_generator.compute_confidence.return_value = 0.8
+        mock_generator.extract_sources.return_value = []
+        monkeypatch.setattr(api_main, "_generator", mock_generator)
+        monkeypatch.setattr(api_main, "_cache_get", lambda key: None)
+        cached = {}
+        monkeypatch.setattr(api_main, "_cache_set", lambda key, val: cached.update(val))
+
+        resp = client.post("/api/v1/chat/stream", json={"message": "Torque spec?"})
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = [json.loads(line[5:]) for line in resp.text.splitlines() if line.startswith("data:")]
+        assert [e["delta"] for e in events[:-1]] == ["25 ", "N·m."]
+        assert events[-1]["answer"] == "25 N·m."
+        assert events[-1]["conversation_id"] == "conv-s"
+        assert cached["answer"] == "25 N·m."
+        assert mock_store.append_message.call_count == 2
+
 
 # ── Conversation endpoints ────────────────────────────────────────────
 class TestConversationEndpoints:
-    def test_get_conversation_not_found(self, client):
+    def test_get_conversation_not_found(self, client, monkeypatch):
         from src.api import main as api_main
-        api_main._store = MagicMock()
+        monkeypatch.setattr(api_main, "_store", MagicMock())
         api_main._store.get_conversation.return_value = None
 
         resp = client.get("/api/v1/conversations/nonexistent-id")
         assert resp.status_code == 404
 
-    def test_get_conversation_success(self, client):
+    def test_get_conversation_success(self, client, monkeypatch):
         from src.api import main as api_main
-        api_main._store = MagicMock()
+        monkeypatch.setattr(api_main, "_store", MagicMock())
         api_main._store.get_conversation.return_value = {
             "id": "conv-1",
             "session_id": "sess-1",
@@ -157,17 +321,17 @@ class TestConversationEndpoints:
         assert resp.status_code == 200
         assert resp.json()["id"] == "conv-1"
 
-    def test_delete_conversation_not_found(self, client):
+    def test_delete_conversation_not_found(self, client, monkeypatch):
         from src.api import main as api_main
-        api_main._store = MagicMock()
+        monkeypatch.setattr(api_main, "_store", MagicMock())
         api_main._store.delete.return_value = False
 
         resp = client.delete("/api/v1/conversations/bad-id")
         assert resp.status_code == 404
 
-    def test_delete_conversation_success(self, client):
+    def test_delete_conversation_success(self, client, monkeypatch):
         from src.api import main as api_main
-        api_main._store = MagicMock()
+        monkeypatch.setattr(api_main, "_store", MagicMock())
         api_main._store.delete.return_value = True
 
         resp = client.delete("/api/v1/conversations/conv-1")
@@ -1,5 +1,7 @@
 """Tests for src/ingestion/chunker.py"""
 
+from functools import lru_cache
+
 import pytest
 
 from src.ingestion.parser import ParsedSection
@@ -72,27 +74,40 @@ def _make_section(text: str, section_type: str = "paragraph", page: int = 1) ->
     )
 
 
+_SHORT_SECTIONS = tuple(
+    _make_section(f"Short para {n}.") for n in ("one", "two", "three")
+)
+
+
+@pytest.fixture(scope="session")
+def chunker_factory():
+    """Shared HybridChunker instances keyed by (chunk_size, chunk_overlap).
+
+    HybridChunker keeps no per-call state, so one instance per config
+    can serve every test.
+    """
+    @lru_cache(maxsize=8)
+    def _make(chunk_size: int = 512, chunk_overlap: int = 50) -> HybridChunker:
+        return HybridChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return _make
+
+
 class TestHybridChunker:
-    def test_short_sections_merge_into_single_chunk(self):
-        sections = [
-            _make_section("Short para one."),
-            _make_section("Short para two."),
-            _make_section("Short para three."),
-        ]
-        chunker = HybridChunker(chunk_size=512, chunk_overlap=50)
-        chunks = chunker.chunk(sections)
+    def test_short_sections_merge_into_single_chunk(self, chunker_factory):
+        chunker = chunker_factory(512, 50)
+        chunks = chunker.chunk(list(_SHORT_SECTIONS))
         # All three should merge into one chunk (total text is tiny)
         assert len(chunks) == 1
         assert "Short para one" in chunks[0].text
         assert "Short para three" in chunks[0].text
 
-    def test_tables_are_never_split(self):
+    def test_tables_are_never_split(self, chunker_factory):
         # Create a table that exceeds normal chunk size
         big_table = "| " + " | ".join([f"Col{i}" for i in range(20)]) + " |\n"
         big_table += ("| " + " | ".join(["data"] * 20) + " |\n") * 10
 
         sections = [_make_section(big_table, section_type="table")]
-        chunker = HybridChunker(chunk_size=64, chunk_overlap=10)  # very small chunk size
+        chunker = chunker_factory(64, 10)  # very small chunk size
         chunks = chunker.chunk(sections)
 
         # Table should be a single chunk regardless of size
@@ -100,23 +115,23 @@ class TestHybridChunker:
         assert len(table_chunks) == 1
         assert big_table.strip() in table_chunks[0].text
 
-    def test_heading_becomes_context_prefix(self):
+    def test_heading_becomes_context_prefix(self, chunker_factory):
         sections = [
             _make_section("Brake System Overview", section_type="heading"),
             _make_section("The brake pads should be replaced every 30,000 miles."),
         ]
-        chunker = HybridChunker(chunk_size=512, chunk_overlap=50)
+        chunker = chunker_factory(512, 50)
         chunks = chunker.chunk(sections)
 
         # At least one chunk should have the heading as context_prefix
         prefixed = [c for c in chunks if c.metadata.get("context_prefix") == "Brake System Overview"]
         assert len(prefixed) >= 1
 
-    def test_long_paragraph_is_split(self):
+    def test_long_paragraph_is_split(self, chunker_factory):
         # 200 words ≈ 1000 chars → should exceed a 128-token (512 char) budget
         long_text = " ".join(["word"] * 200)
         sections = [_make_section(long_text)]
-        chunker = HybridChunker(chunk_size=128, chunk_overlap=20)
+        chunker = chunker_factory(128, 20)
         chunks = chunker.chunk(sections)
         assert len(chunks) > 1
         # Each chunk should be ≤ budget (with some tolerance for overlap)
@@ -124,20 +139,20 @@ class TestHybridChunker:
             # Overlap can push slightly over; allow 2x budget
             assert len(chunk.text) <= 128 * 4 * 2  # chars
 
-    def test_chunk_ids_are_unique(self):
+    def test_chunk_ids_are_unique(self, chunker_factory):
         sections = [
             _make_section("Para " + str(i) + " with some content here.") for i in range(10)
         ]
-        chunker = HybridChunker(chunk_size=128, chunk_overlap=20)
+        chunker = chunker_factory(128, 20)
         chunks = chunker.chunk(sections)
         ids = [c.metadata["chunk_id"] for c in chunks]
         assert len(ids) == len(set(ids))  # all unique
 
-    def test_empty_input_returns_empty(self):
-        chunker = HybridChunker()
+    def test_empty_input_returns_empty(self, chunker_factory):
+        chunker = chunker_factory()
         assert chunker.chunk([]) == []
 
-    def test_metadata_flows_through(self):
+    def test_metadata_flows_through(self, chunker_factory):
         sections = [
             ParsedSection(
                 text="Test paragraph with enough content.",
@@ -149,7 +164,7 @@ class TestHybridChunker:
                 },
             )
         ]
-        chunker = HybridChunker(chunk_size=512, chunk_overlap=50)
+        chunker = chunker_factory(512, 50)
         chunks = chunker.chunk(sections)
         assert chunks[0].metadata["source_file"] == "manual.pdf"
         assert chunks[0].metadata["page"] == 42
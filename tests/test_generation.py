@@ -1,5 +1,6 @@
 """Tests for src/generation/ — prompts, generator, streamer."""
 
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 
 import pytest
@@ -18,6 +19,23 @@ def _chunk(text: str, source: str = "manual.pdf", page: int = 5, score: float =
     )
 
 
+def _completion(content: str, prompt_tokens: int, completion_tokens: int) -> SimpleNamespace:
+    """Plain stand-in for an OpenAI chat completion response."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        ),
+    )
+
+
+@pytest.fixture(scope="module")
+def fake_openai_response() -> SimpleNamespace:
+    return _completion("The oil capacity is 3.7 quarts.", 100, 50)
+
+
 # ── Prompt formatting ─────────────────────────────────────────────────
 class TestFormatContext:
     def test_formats_single_chunk(self):
@@ -103,19 +121,19 @@ class TestConfidenceAndSources:
             _chunk("C", score=0.7),
             _chunk("D", score=0.1),  # 4th chunk should be ignored
         ]
-        conf = AutomotiveGenerator._compute_confidence(chunks)
+        conf = AutomotiveGenerator.compute_confidence(chunks)
         expected = round((0.9 + 0.8 + 0.7) / 3, 3)
         assert conf == expected
 
     def test_confidence_empty_chunks_is_zero(self):
-        assert AutomotiveGenerator._compute_confidence([]) == 0.0
+        assert AutomotiveGenerator.compute_confidence([]) == 0.0
 
     def test_extract_sources(self):
         chunks = [
             _chunk("A", source="a.pdf", page=10, score=0.9),
             _chunk("B", source="b.pdf", page=20, score=0.7),
         ]
-        sources = AutomotiveGenerator._extract_sources(chunks)
+        sources = AutomotiveGenerator.extract_sources(chunks)
         assert len(sources) == 2
         assert sources[0]["source_id"] == 1
         assert sources[0]["source_file"] == "a.pdf"
@@ -126,15 +144,11 @@ class TestConfidenceAndSources:
 # ── Generator (mocked OpenAI) ─────────────────────────────────────────
 class TestAutomotiveGenerator:
     @patch("src.generation.generator.OpenAI")
-    def test_generate_returns_result(self, mock_openai_cls):
+    def test_generate_returns_result(self, mock_openai_cls, fake_openai_response):
         # Mock the OpenAI client
         mock_client = MagicMock()
         mock_openai_cls.return_value = mock_client
-
-        mock_response = MagicMock()
-        mock_response.choices = [MagicMock(message=MagicMock(content="The oil capacity is 3.7 quarts."))]
-        mock_response.usage = MagicMock(prompt_tokens=100, completion_tokens=50, total_tokens=150)
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.create.return_value = fake_openai_response
 
         generator = AutomotiveGenerator(streaming=False)
         chunks = [_chunk("Oil capacity: 3.7 quarts.", score=0.88)]
@@ -155,13 +169,26 @@ class TestAutomotiveGenerator:
         mock_client = MagicMock()
         mock_openai_cls.return_value = mock_client
 
-        mock_response = MagicMock()
-        mock_response.choices = [MagicMock(message=MagicMock(content="No information found."))]
-        mock_response.usage = MagicMock(prompt_tokens=80, completion_tokens=10, total_tokens=90)
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.create.return_value = _completion("No information found.", 80, 10)
 
         generator = AutomotiveGenerator(streaming=False)
         result = generator.generate(query="Random question", context_chunks=[])
 
         assert result.confidence == 0.0
         assert result.sources == []
+
+    @patch("src.generation.streamer.OpenAI")
+    @patch("src.generation.generator.OpenAI")
+    def test_stream_yields_tokens_and_full_text(self, _mock_gen_openai, mock_stream_openai):
+        def _delta(text):
+            return MagicMock(choices=[MagicMock(delta=MagicMock(content=text))])
+
+        mock_stream_openai.return_value.chat.completions.create.return_value = iter(
+            [_delta("3.7 "), _delta(None), _delta("quarts.")]
+        )
+
+        generator = AutomotiveGenerator(streaming=False)
+        stream = generator.stream(query="Oil capacity?", context_chunks=[_chunk("3.7 quarts.")])
+
+        assert list(stream) == ["3.7 ", "quarts."]
+        assert stream.full_text == "3.7 quarts."
@@ -0,0 +1,105 @@
+"""Tests for src/memory/conversation_store.py"""
+
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import pytest
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.memory.conversation_store import (
+    Conversation,
+    ConversationStore,
+    _SUMMARY_RESERVE,
+    _approx_tokens,
+)
+
+
+# ── Helper ────────────────────────────────────────────────────────────
+def _msg(role: str, content: str, metadata: dict | None = None) -> dict:
+    return {"role": role, "content": content, "metadata": metadata or {}}
+
+
+# ── History budgeting ─────────────────────────────────────────────────
+@pytest.fixture
+def fake_conv():
+    """Patch the DB session so the store reads/writes an in-memory conversation."""
+    conv = SimpleNamespace(messages=[])
+    db = MagicMock()
+    db.__enter__.return_value = db
+    db.query.return_value.filter_by.return_value.one_or_none.return_value = conv
+    with patch("src.memory.conversation_store._get_session", return_value=db):
+        yield conv, db
+
+
+class TestHistoryForPrompt:
+    def test_short_history_is_returned_verbatim(self, fake_conv):
+        conv, db = fake_conv
+        conv.messages = [_msg("user", "Q1"), _msg("assistant", "A1")]
+
+        history = ConversationStore().get_history_for_prompt("c1")
+
+        assert history == [
+            {"role": "user", "content": "Q1"},
+            {"role": "assistant", "content": "A1"},
+        ]
+        db.commit.assert_not_called()
+
+    def test_old_messages_are_summarised(self, fake_conv):
+        conv, db = fake_conv
+        conv.messages = [
+            _msg("user", "Oil capacity for a 2022 Civic?"),
+            _msg("assistant", "3.7 quarts. " + "w" * 600),
+            _msg("user", "x" * 400),
+        ]
+        budget = _approx_tokens("x" * 400) + _SUMMARY_RESERVE
+
+        history = ConversationStore().get_history_for_prompt("c1", max_tokens=budget)
+
+        assert history[0]["role"] == "system"
+        assert history[0]["content"].startswith("Prior summary: user: Oil capacity")
+        assert history[1:] == [{"role": "user", "content": "x" * 400}]
+        # Summary is persisted on the first message for reuse
+        meta = conv.messages[0]["metadata"]
+        assert meta["summary_of_prefix_up_to"] == 2
+        db.commit.assert_called_once()
+
+    def test_persisted_summary_is_reused(self, fake_conv):
+        conv, db = fake_conv
+        conv.messages = [
+            _msg("user", "Q1", {"prefix_summary": "cached gist", "summary_of_prefix_up_to": 2}),
+            _msg("assistant", "A1 " + "w" * 600),
+            _msg("user", "y" * 400),
+        ]
+        budget = _approx_tokens("y" * 400) + _SUMMARY_RESERVE
+
+        history = ConversationStore().get_history_for_prompt("c1", max_tokens=budget)
+
+        assert history[0]["content"] == "Prior summary: cached gist"
+        db.commit.assert_not_called()
+
+    @pytest.mark.parametrize("max_tokens", [50, 200, 400, 3000])
+    def test_summarised_history_stays_within_budget(self, fake_conv, max_tokens):
+        conv, _ = fake_conv
+        conv.messages = [_msg("user" if i % 2 else "assistant", f"turn {i} " + "z" * 600) for i in range(20)]
+
+        history = ConversationStore().get_history_for_prompt("c1", max_tokens=max_tokens)
+
+        assert history[0]["role"] == "system"
+        assert sum(_approx_tokens(m["content"]) for m in history) <= max_tokens
+
+    def test_missing_conversation_returns_empty(self, fake_conv):
+        _, db = fake_conv
+        db.query.return_value.filter_by.return_value.one_or_none.return_value = None
+        assert ConversationStore().get_history_for_prompt("nope") == []
+
+
+# ── Schema ────────────────────────────────────────────────────────────
+class TestSchema:
+    def test_json_columns_are_jsonb(self):
+        columns = Conversation.__table__.c
+        assert isinstance(columns.messages.type, JSONB)
+        assert isinstance(columns.filters.type, JSONB)
+
+    def test_filters_has_gin_index(self):
+        index = next(i for i in Conversation.__table__.indexes if i.name == "ix_conv_filters_gin")
+        assert index.dialect_options["postgresql"]["using"] == "gin"
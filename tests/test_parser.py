@@ -1,7 +1,10 @@
 """Tests for src/ingestion/parser.py"""
 
-import tempfile
+import itertools
+import zipfile
+from collections import defaultdict
 from pathlib import Path
+from xml.sax.saxutils import escape
 
 import pytest
 
@@ -9,6 +12,7 @@ from src.ingestion.parser import (
     parse_document,
     ParsedSection,
     _clean,
+    _load_soup,
     _table_to_text,
 )
 
@@ -21,96 +25,197 @@ class TestUtilities:
     def test_clean_strips_newlines(self):
         assert _clean("hello\n\nworld") == "hello world"
 
+    def test_clean_single_spaced_text_is_only_stripped(self):
+        assert _clean(" Engine Specs ") == "Engine Specs"
+
+    @pytest.mark.parametrize("raw", ["a\rb", "a\tb", "a\xa0b", "a\u2028b"])
+    def test_clean_normalises_other_whitespace(self, raw):
+        assert _clean(raw) == "a b"
+
     def test_table_to_text_basic(self):
         rows = [["Make", "Model"], ["Honda", "Civic"]]
         result = _table_to_text(rows)
-        assert "| Make" in result
-        assert "| Honda" in result
-        assert len(result.strip().split("\n")) == 2
+        assert result.rows == ("| Make  | Model |", "| Honda | Civic |")
+        assert result.text == "\n".join(result.rows)
+        assert str(result) == result.text
 
     def test_table_to_text_empty(self):
-        assert _table_to_text([]) == ""
+        result = _table_to_text([])
+        assert result.text == ""
+        assert result.rows == ()
 
     def test_table_to_text_ragged_rows(self):
         rows = [["A", "B", "C"], ["X"]]
         result = _table_to_text(rows)
-        assert "| A" in result
-        assert "| X" in result
+        assert result.rows == ("| A | B | C |", "| X |   |   |")
+
+
+# ── Fixture files ─────────────────────────────────────────────────────
+@pytest.fixture(scope="class")
+def fixture_dir(tmp_path_factory) -> Path:
+    """One temp directory per test class for generated input files."""
+    return tmp_path_factory.mktemp("parser")
+
+
+@pytest.fixture(scope="class")
+def write_html(fixture_dir):
+    """Factory that writes an HTML body into the class's fixture_dir."""
+    names = itertools.count()
+
+    def _write(content: str) -> Path:
+        path = fixture_dir / f"doc{next(names)}.html"
+        path.write_text(f"<html><body>{content}</body></html>", encoding="utf-8")
+        return path
+    return _write
+
+
+_W_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+
+# Minimal package parts for a one-part DOCX with Normal / Heading 1 styles.
+_DOCX_SKELETON = {
+    "[Content_Types].xml": (
+        f'{_XML_DECL}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        f'{_XML_DECL}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+        '</Relationships>'
+    ),
+    "word/_rels/document.xml.rels": (
+        f'{_XML_DECL}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    "word/styles.xml": (
+        f'{_XML_DECL}<w:styles {_W_NS}>'
+        '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+        '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>'
+        '</w:styles>'
+    ),
+}
+
+
+def _docx_paragraph(text: str, style: str) -> str:
+    style_id = style.replace(" ", "")  # "Heading 1" → "Heading1"
+    return (
+        f'<w:p><w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>'
+        f'<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+    )
+
+
+@pytest.fixture(scope="class")
+def create_docx(fixture_dir):
+    """Factory that writes a DOCX with the given paragraphs into fixture_dir."""
+    names = itertools.count()
+
+    def _create(paragraphs: list[dict]) -> Path:
+        body = "".join(_docx_paragraph(p["text"], p.get("style", "Normal")) for p in paragraphs)
+        path = fixture_dir / f"doc{next(names)}.docx"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, xml in _DOCX_SKELETON.items():
+                zf.writestr(name, xml)
+            zf.writestr(
+                "word/document.xml",
+                f"{_XML_DECL}<w:document {_W_NS}><w:body>{body}</w:body></w:document>",
+            )
+        return path
+    return _create
 
 
 # ── HTML Parser ───────────────────────────────────────────────────────
-def _write_html(content: str) -> Path:
-    tmp = tempfile.NamedTemporaryFile(suffix=".html", mode="w", delete=False, encoding="utf-8")
-    tmp.write(f"<html><body>{content}</body></html>")
-    tmp.close()
-    return Path(tmp.name)
+_RICH_HTML = (
+    "<h1>Engine Specs</h1><p>Some paragraph content here.</p>"
+    "<ul><li>Item A</li><li>Item B</li><li>Item C</li></ul>"
+    "<ol><li>Step one</li><li>Step two</li></ol>"
+    "<table><tr><th>Spec</th><th>Value</th></tr><tr><td>Torque</td><td>25 N·m</td></tr></table>"
+    '<script>alert("x")</script><p>Good content here.</p>'
+)
+
+
+@pytest.fixture(scope="class")
+def rich_html(write_html) -> Path:
+    return write_html(_RICH_HTML)
+
+
+@pytest.fixture(scope="class")
+def rich_sections(rich_html) -> dict[str, list[ParsedSection]]:
+    """One parse of a document holding every HTML construct, grouped by type."""
+    by_type: dict[str, list[ParsedSection]] = defaultdict(list)
+    for section in parse_document(rich_html):
+        by_type[section.metadata["section_type"]].append(section)
+    return by_type
 
 
 class TestHTMLParser:
-    def test_parses_headings(self):
-        sections = parse_document(_write_html("<h1>Engine Specs</h1><p>Some paragraph content here.</p>"))
-        headings = [s for s in sections if s.metadata["section_type"] == "heading"]
+    def test_parses_headings(self, rich_sections):
+        headings = rich_sections["heading"]
         assert len(headings) >= 1
         assert headings[0].text == "Engine Specs"
         assert headings[0].metadata["level"] == 1
 
-    def test_parses_unordered_list(self):
-        sections = parse_document(_write_html("<ul><li>Item A</li><li>Item B</li><li>Item C</li></ul>"))
-        lists = [s for s in sections if s.metadata["section_type"] == "list"]
-        assert len(lists) == 1
-        assert "• Item A" in lists[0].text
-        assert lists[0].metadata["item_count"] == 3
-
-    def test_parses_ordered_list(self):
-        sections = parse_document(_write_html("<ol><li>Step one</li><li>Step two</li></ol>"))
-        lists = [s for s in sections if s.metadata["section_type"] == "list"]
-        assert "1. Step one" in lists[0].text
-        assert "2. Step two" in lists[0].text
-
-    def test_parses_table(self):
-        html = "<table><tr><th>Spec</th><th>Value</th></tr><tr><td>Torque</td><td>25 N·m</td></tr></table>"
-        sections = parse_document(_write_html(html))
-        tables = [s for s in sections if s.metadata["section_type"] == "table"]
+    def test_parses_unordered_list(self, rich_sections):
+        bullets = [s for s in rich_sections["list"] if "•" in s.text]
+        assert len(bullets) == 1
+        assert "• Item A" in bullets[0].text
+        assert bullets[0].metadata["item_count"] == 3
+
+    def test_parses_ordered_list(self, rich_sections):
+        numbered = [s for s in rich_sections["list"] if "1. Step one" in s.text]
+        assert len(numbered) == 1
+        assert "2. Step two" in numbered[0].text
+
+    def test_parses_table(self, rich_sections):
+        tables = rich_sections["table"]
         assert len(tables) == 1
         assert "Torque" in tables[0].text
         assert tables[0].metadata["row_count"] == 2
 
-    def test_strips_script_tags(self):
-        sections = parse_document(_write_html('<script>alert("x")</script><p>Good content here.</p>'))
-        all_text = " ".join(s.text for s in sections)
+    def test_strips_script_tags(self, rich_sections):
+        all_text = " ".join(s.text for group in rich_sections.values() for s in group)
         assert "alert" not in all_text
         assert "Good content" in all_text
 
-    def test_metadata_has_source_file(self):
-        path = _write_html("<p>Hello world content here.</p>")
-        sections = parse_document(path)
-        for s in sections:
-            assert s.metadata["source_file"] == path.name
+    def test_metadata_has_source_file(self, rich_html, rich_sections):
+        for group in rich_sections.values():
+            for s in group:
+                assert s.metadata["source_file"] == rich_html.name
 
+    def test_fragment_without_body_tag(self, fixture_dir):
+        path = fixture_dir / "fragment.html"
+        path.write_text("<h1>Brakes</h1><p>Check pad thickness first.</p>", encoding="utf-8")
+        assert [s.metadata["section_type"] for s in parse_document(path)] == ["heading", "paragraph"]
 
-# ── DOCX Parser ───────────────────────────────────────────────────────
-def _create_docx(paragraphs: list[dict]) -> Path:
-    from docx import Document
-    doc = Document()
-    for p in paragraphs:
-        doc.add_paragraph(p["text"], style=p.get("style", "Normal"))
-    tmp = tempfile.NamedTemporaryFile(suffix=".docx", delete=False)
-    doc.save(tmp.name)
-    tmp.close()
-    return Path(tmp.name)
+    def test_reparse_of_unchanged_file_reuses_soup(self, rich_html, rich_sections):
+        hits = _load_soup.cache_info().hits
+        again = parse_document(rich_html)
+        assert _load_soup.cache_info().hits == hits + 1
+        assert len(again) == sum(len(group) for group in rich_sections.values())
 
+    def test_edited_file_is_reparsed(self, write_html):
+        path = write_html("<h1>Old</h1>")
+        assert parse_document(path)[0].text == "Old"
+        path.write_text("<html><body><h1>New title</h1></body></html>", encoding="utf-8")
+        assert parse_document(path)[0].text == "New title"
 
+
+# ── DOCX Parser ───────────────────────────────────────────────────────
 class TestDOCXParser:
-    def test_parses_paragraphs(self):
-        sections = parse_document(_create_docx([
+    def test_parses_paragraphs(self, create_docx):
+        sections = parse_document(create_docx([
             {"text": "First paragraph with enough content."},
             {"text": "Second paragraph with enough content."},
         ]))
         paras = [s for s in sections if s.metadata["section_type"] == "paragraph"]
         assert len(paras) >= 2
 
-    def test_detects_headings(self):
-        sections = parse_document(_create_docx([
+    def test_detects_headings(self, create_docx):
+        sections = parse_document(create_docx([
             {"text": "Main Title", "style": "Heading 1"},
             {"text": "Body text here."},
         ]))
@@ -118,8 +223,8 @@ class TestDOCXParser:
         assert len(headings) >= 1
         assert "Main Title" in headings[0].text
 
-    def test_metadata_source_file(self):
-        path = _create_docx([{"text": "Test content."}])
+    def test_metadata_source_file(self, create_docx):
+        path = create_docx([{"text": "Test content."}])
         sections = parse_document(path)
         for s in sections:
             assert s.metadata["source_file"] == path.name
@@ -131,8 +236,8 @@ class TestParseDocument:
         with pytest.raises(FileNotFoundError):
             parse_document("/nonexistent/path/file.pdf")
 
-    def test_raises_on_unsupported_extension(self):
-        tmp = tempfile.NamedTemporaryFile(suffix=".xyz", delete=False)
-        tmp.close()
+    def test_raises_on_unsupported_extension(self, tmp_path):
+        path = tmp_path / "manual.xyz"
+        path.touch()
         with pytest.raises(ValueError, match="Unsupported file type"):
-            parse_document(tmp.name)
+            parse_document(path)
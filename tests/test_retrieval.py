@@ -1,12 +1,15 @@
 """Tests for src/retrieval/ — dense, sparse, reranker, hybrid."""
 
+from collections import namedtuple
 from unittest.mock import patch, MagicMock
 
+import numpy as np
 import pytest
 
 from src.retrieval.dense_retriever import DenseRetriever, RetrievedChunk
 from src.retrieval.hybrid_retriever import HybridRetriever
 from src.retrieval.sparse_retriever import SparseRetriever
+from src.retrieval import reranker as reranker_module
 from src.retrieval.reranker import Reranker
 
 
@@ -49,52 +52,187 @@ class TestDenseRetrieverFilterBuilder:
         # "color" is not a supported filter key
         assert result == {"make": {"$eq": "Honda"}}
 
+    def test_equivalent_filters_share_cached_expression(self):
+        first = DenseRetriever._build_filter({"year": 2022, "make": "Honda"})
+        second = DenseRetriever._build_filter({"make": "Honda", "model": None, "year": 2022})
+        assert first is second
+
+    def test_list_values_become_in_clauses_and_are_cached(self):
+        first = DenseRetriever._build_filter({"make": ["Honda", "Acura"]})
+        second = DenseRetriever._build_filter({"make": ["Honda", "Acura"]})
+        assert first == {"make": {"$in": ["Honda", "Acura"]}}
+        assert first is second
+
+    @pytest.mark.parametrize("value", [{"$gte": 2020}, [["Honda"]]])
+    def test_non_scalar_values_are_rejected(self, value):
+        with pytest.raises(ValueError, match="scalar"):
+            DenseRetriever._build_filter({"year": value})
+
+
+# ── DenseRetriever batch embedding ───────────────────────────────────
+class TestDenseRetrieverEmbedMany:
+    @patch("src.retrieval.dense_retriever.Pinecone")
+    @patch("src.retrieval.dense_retriever.OpenAI")
+    def test_single_call_preserves_input_order(self, mock_openai_cls, mock_pc_cls):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        # API returns data out of order; embed_many must restore it
+        mock_client.embeddings.create.return_value = MagicMock(data=[
+            MagicMock(index=1, embedding=[0.2]),
+            MagicMock(index=0, embedding=[0.1]),
+        ])
+
+        retriever = DenseRetriever(top_k=3)
+        vectors = retriever.embed_many(["civic oil", "camry oil"])
+
+        np.testing.assert_allclose(vectors, [[0.1], [0.2]], rtol=1e-6)
+        assert all(v.dtype == np.float32 for v in vectors)
+        mock_client.embeddings.create.assert_called_once()
+        assert mock_client.embeddings.create.call_args[1]["input"] == ["civic oil", "camry oil"]
+
+    @patch("src.retrieval.dense_retriever.Pinecone")
+    @patch("src.retrieval.dense_retriever.OpenAI")
+    def test_empty_input_skips_api(self, mock_openai_cls, mock_pc_cls):
+        retriever = DenseRetriever(top_k=3)
+        assert retriever.embed_many([]) == []
+        mock_openai_cls.return_value.embeddings.create.assert_not_called()
+
+    @patch("src.retrieval.dense_retriever.Pinecone")
+    @patch("src.retrieval.dense_retriever.OpenAI")
+    def test_normalised_repeat_query_hits_cache(self, mock_openai_cls, mock_pc_cls):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.embeddings.create.return_value = MagicMock(data=[
+            MagicMock(index=0, embedding=[0.5]),
+        ])
+
+        retriever = DenseRetriever(top_k=3)
+        first = retriever._embed_query("Oil capacity Civic")
+        second = retriever._embed_query("  oil   CAPACITY civic ")
+
+        assert first is second
+        assert first.tolist() == [0.5]
+        mock_client.embeddings.create.assert_called_once()
+
+    @patch("src.retrieval.dense_retriever.Pinecone")
+    @patch("src.retrieval.dense_retriever.OpenAI")
+    def test_cached_vector_is_sent_to_pinecone_as_list(self, mock_openai_cls, mock_pc_cls):
+        index = mock_pc_cls.return_value.Index.return_value
+        index.query.return_value = MagicMock(matches=[])
+
+        DenseRetriever(top_k=3).retrieve("q", query_vector=np.array([0.5, 0.25], dtype=np.float32))
+
+        assert index.query.call_args[1]["vector"] == [0.5, 0.25]
+
+
+# ── HybridRetriever comparison path ──────────────────────────────────
+class TestHybridComparison:
+    @patch("src.retrieval.hybrid_retriever.Reranker")
+    @patch("src.retrieval.hybrid_retriever.SparseRetriever")
+    @patch("src.retrieval.hybrid_retriever.DenseRetriever")
+    def test_comparison_embeds_once_and_queries_per_vehicle(self, mock_dense_cls, mock_sparse_cls, mock_reranker_cls):
+        dense = mock_dense_cls.return_value
+        dense.embed_many.return_value = [[0.1], [0.2]]
+        dense.retrieve.side_effect = lambda q, f, v: [_chunk(q, chunk_id=q)]
+        mock_sparse_cls.return_value.retrieve.return_value = []
+        mock_reranker_cls.return_value.rerank.side_effect = lambda q, c: c
+
+        retriever = HybridRetriever(top_k=3, rerank_n=2)
+        results = retriever.retrieve("compare oil capacity civic vs camry")
+
+        dense.embed_many.assert_called_once()
+        assert dense.embed_many.call_args[0][0] == [
+            "oil capacity Honda Civic", "oil capacity Toyota Camry",
+        ]
+        # Each vehicle query reuses its pre-computed vector
+        vectors_used = sorted(c[0][2] for c in dense.retrieve.call_args_list)
+        assert vectors_used == [[0.1], [0.2]]
+        assert [c.text for c in results] == [
+            "oil capacity Honda Civic", "oil capacity Toyota Camry",
+        ]
+
+    @patch("src.retrieval.hybrid_retriever.Reranker")
+    @patch("src.retrieval.hybrid_retriever.SparseRetriever")
+    @patch("src.retrieval.hybrid_retriever.DenseRetriever")
+    def test_vehicles_follow_mention_order_and_dedupe(self, mock_dense_cls, mock_sparse_cls, mock_reranker_cls):
+        dense = mock_dense_cls.return_value
+        dense.embed_many.return_value = [[0.1], [0.2]]
+        dense.retrieve.return_value = []
+        mock_sparse_cls.return_value.retrieve.return_value = []
+        mock_reranker_cls.return_value.rerank.return_value = []
+
+        retriever = HybridRetriever(top_k=3, rerank_n=2)
+        retriever.retrieve("Difference between Camry and F-150 / F150 towing")
+
+        assert dense.embed_many.call_args[0][0] == [
+            "and  /  towing Toyota Camry", "and  /  towing Ford F-150",
+        ]
+
+    @patch("src.retrieval.hybrid_retriever.Reranker")
+    @patch("src.retrieval.hybrid_retriever.SparseRetriever")
+    @patch("src.retrieval.hybrid_retriever.DenseRetriever")
+    def test_single_vehicle_comparison_uses_normal_path(self, mock_dense_cls, mock_sparse_cls, mock_reranker_cls):
+        dense = mock_dense_cls.return_value
+        dense.retrieve.return_value = []
+        mock_sparse_cls.return_value.retrieve.return_value = []
+        mock_reranker_cls.return_value.rerank.return_value = []
+
+        retriever = HybridRetriever(top_k=3, rerank_n=2)
+        retriever.retrieve("f-150 vs f150 payload")
+
+        dense.embed_many.assert_not_called()
+        assert dense.retrieve.call_args[0][0] == "f-150 vs f150 payload"
+
 
 # ── RRF merge ─────────────────────────────────────────────────────────
+# Shared, read-only inputs — RRF builds new chunks and never mutates these.
+_A, _B, _C, _X = (_chunk(t, chunk_id=t.lower()) for t in "ABCX")
+
+RRF_CASES = [
+    # (id, input lists, expected order)
+    ("single_list_preserves_order", ([_A, _B, _C],), ["A", "B", "C"]),
+    ("duplicate_across_lists_is_merged", ([_A], [_A]), ["A"]),
+    # B: 1/(60+2) + 1/(60+1)  >  A: 1/(60+1) + 1/(60+3)  >  X: 1/(60+2)
+    ("higher_combined_rank_wins", ([_A, _B], [_B, _X, _A]), ["B", "A", "X"]),
+    ("empty_lists", ([], []), []),
+]
+
+
 class TestRecipocalRankFusion:
-    def test_single_list_preserves_order(self):
-        chunks = [
-            _chunk("A", score=0.9, chunk_id="a"),
-            _chunk("B", score=0.7, chunk_id="b"),
-            _chunk("C", score=0.5, chunk_id="c"),
-        ]
-        merged = HybridRetriever._reciprocal_rank_fusion(chunks)
-        # Order should be preserved (rank 1 gets highest RRF score)
-        assert merged[0].text == "A"
-        assert merged[1].text == "B"
-        assert merged[2].text == "C"
-
-    def test_duplicate_across_lists_is_merged(self):
-        list_a = [_chunk("shared", score=0.9, chunk_id="shared_id")]
-        list_b = [_chunk("shared", score=0.8, chunk_id="shared_id")]
-        merged = HybridRetriever._reciprocal_rank_fusion(list_a, list_b)
-        # Should be deduplicated to one entry
-        assert len(merged) == 1
+    @pytest.mark.parametrize("lists, expected", [c[1:] for c in RRF_CASES], ids=[c[0] for c in RRF_CASES])
+    def test_fused_order(self, lists, expected):
+        merged = HybridRetriever._reciprocal_rank_fusion(*lists)
+        assert [c.text for c in merged] == expected
+
+    def test_duplicate_scores_are_summed(self):
+        merged = HybridRetriever._reciprocal_rank_fusion([_A], [_A])
         # RRF score should be sum of both ranks: 1/(60+1) + 1/(60+1)
         expected_score = 1.0 / 61 + 1.0 / 61
         assert abs(merged[0].score - expected_score) < 1e-6
 
-    def test_higher_combined_rank_wins(self):
-        # A appears at rank 1 in list_a, rank 3 in list_b
-        # B appears at rank 2 in list_a, rank 1 in list_b
-        list_a = [
-            _chunk("A", chunk_id="a"),
-            _chunk("B", chunk_id="b"),
-        ]
-        list_b = [
-            _chunk("B", chunk_id="b"),
-            _chunk("X", chunk_id="x"),
-            _chunk("A", chunk_id="a"),
-        ]
-        merged = HybridRetriever._reciprocal_rank_fusion(list_a, list_b)
-        # B: 1/(60+2) + 1/(60+1) vs A: 1/(60+1) + 1/(60+3)
-        # B should have a higher combined score
-        texts = [c.text for c in merged]
-        assert texts.index("B") < texts.index("A")
+    def test_repeat_within_one_list_counts_once(self):
+        merged = HybridRetriever._reciprocal_rank_fusion([_A, _B, _A])
+        assert [c.text for c in merged] == ["A", "B"]
+        assert abs(merged[0].score - 1.0 / 61) < 1e-9
+
+    def test_chunk_id_is_read_from_metadata(self):
+        assert _chunk("A", chunk_id="a-1").chunk_id == "a-1"
+        assert RetrievedChunk(text="A", score=0.5).chunk_id is None
+
+    def test_missing_chunk_id_is_kept_but_not_merged(self, caplog):
+        orphan_a = RetrievedChunk(text="same text", score=0.9, metadata={})
+        orphan_b = RetrievedChunk(text="same text", score=0.8, metadata={})
+        merged = HybridRetriever._reciprocal_rank_fusion([orphan_a], [orphan_b])
+        assert len(merged) == 2
+        assert "without chunk_id" in caplog.text
 
-    def test_empty_lists(self):
-        merged = HybridRetriever._reciprocal_rank_fusion([], [])
-        assert merged == []
+    def test_limit_keeps_top_candidates_in_order(self):
+        list_a = [_chunk(t, chunk_id=t) for t in "ABCDE"]
+        list_b = [_chunk(t, chunk_id=t) for t in "EDX"]
+        full = HybridRetriever._reciprocal_rank_fusion(list_a, list_b)
+        limited = HybridRetriever._reciprocal_rank_fusion(list_a, list_b, limit=3)
+        assert [c.text for c in limited] == [c.text for c in full[:3]]
+        assert [c.score for c in limited] == [c.score for c in full[:3]]
 
 
 # ── SparseRetriever post-filter ───────────────────────────────────────
@@ -120,19 +258,108 @@ class TestSparseRetrieverFilter:
         # meta doesn't have "year" → should fail
         assert SparseRetriever._matches_filter(meta, filters) is False
 
+    @pytest.mark.parametrize("make, expected", [("Acura", True), ("Toyota", False)])
+    def test_list_value_matches_any_item(self, make, expected):
+        meta = {"make": make, "year": 2022}
+        filters = {"make": ["Honda", "Acura"], "year": 2022}
+        assert SparseRetriever._matches_filter(meta, filters) is expected
+
+
+# ── SparseRetriever end-to-end (mocked Pinecone) ─────────────────────
+def _fake_pinecone_index(docs: dict[str, dict]) -> MagicMock:
+    """Pinecone index mock whose list/fetch serve *docs* (id → metadata)."""
+    index = MagicMock()
+    index.list.return_value = iter([list(docs)])
+    index.fetch.side_effect = lambda ids: MagicMock(vectors={
+        vid: MagicMock(metadata=dict(docs[vid])) for vid in ids
+    })
+    return index
+
+
+class TestSparseRetrieverIndex:
+    @patch("src.retrieval.sparse_retriever.Pinecone")
+    def test_keyword_query_ranks_matching_doc_first(self, mock_pc_cls):
+        mock_pc_cls.return_value.Index.return_value = _fake_pinecone_index({
+            "a": {"text": "Brake pad torque is 25 N·m.", "make": "Honda"},
+            "b": {"text": "Engine oil capacity is 3.7 quarts.", "make": "Honda"},
+            "c": {"text": "Tyre pressure is 35 psi.", "make": "Toyota"},
+        })
+
+        retriever = SparseRetriever(top_k=5)
+        results = retriever.retrieve("engine oil capacity")
+
+        assert results[0].text == "Engine oil capacity is 3.7 quarts."
+        assert results[0].score == 1.0
+        assert "text" not in results[0].metadata
+        assert results[0].metadata["chunk_id"] == "b"  # vector id fills in chunk_id
+
+    @patch("src.retrieval.sparse_retriever.Pinecone")
+    def test_filters_are_applied_post_score(self, mock_pc_cls):
+        mock_pc_cls.return_value.Index.return_value = _fake_pinecone_index({
+            "a": {"text": "Oil capacity is 3.7 quarts.", "make": "Honda"},
+            "b": {"text": "Oil capacity is 4.5 quarts.", "make": "Toyota"},
+            "c": {"text": "Tyre pressure is 35 psi.", "make": "Toyota"},
+        })
+
+        retriever = SparseRetriever(top_k=5)
+        results = retriever.retrieve("oil capacity", filters={"make": "Toyota", "year": None})
+
+        assert [r.metadata["chunk_id"] for r in results] == ["b"]
+
+    @patch("src.retrieval.sparse_retriever.Pinecone")
+    def test_index_build_fetches_all_batches(self, mock_pc_cls):
+        docs = {f"id{i}": {"text": f"doc number {i}"} for i in range(250)}
+        index = _fake_pinecone_index(docs)
+        mock_pc_cls.return_value.Index.return_value = index
+
+        retriever = SparseRetriever(top_k=5)
+        retriever._ensure_index_loaded()
+
+        assert index.fetch.call_count == 3  # 100 + 100 + 50
+        assert [m["chunk_id"] for m in retriever._metas] == list(docs)
+
+    @patch("src.retrieval.sparse_retriever.Pinecone")
+    def test_unknown_terms_return_nothing(self, mock_pc_cls):
+        mock_pc_cls.return_value.Index.return_value = _fake_pinecone_index({
+            "a": {"text": "Brake pad torque is 25 N·m."},
+        })
+
+        retriever = SparseRetriever(top_k=5)
+        assert retriever.retrieve("windshield wiper") == []
+
 
 # ── Reranker (mocked) ─────────────────────────────────────────────────
-class TestReranker:
-    @patch("src.retrieval.reranker.cohere.Client")
-    def test_reranker_reorders_by_score(self, mock_client_cls):
-        # Mock the Cohere client to return reversed order with scores
-        mock_client = MagicMock()
-        mock_client_cls.return_value = mock_client
+RerankResult = namedtuple("RerankResult", "index relevance_score")
+
+
+class FakeRerankResponse:
+    """Stand-in for cohere's rerank response — just the .results list."""
+    __slots__ = ("results",)
+
+    def __init__(self, results: list[RerankResult]):
+        self.results = results
+
+
+@pytest.fixture(scope="module")
+def mock_cohere_cls():
+    """Patch cohere.Client once for every reranker test in the module."""
+    with patch.object(reranker_module.cohere, "Client") as cls:
+        yield cls
 
+
+@pytest.fixture
+def mock_cohere(mock_cohere_cls):
+    """The client instance Reranker() receives; call history cleared per test."""
+    yield mock_cohere_cls.return_value
+    mock_cohere_cls.reset_mock()
+
+
+class TestReranker:
+    def test_reranker_reorders_by_score(self, mock_cohere):
         # Simulate Cohere returning index 1 first (higher score)
-        mock_client.rerank.return_value = MagicMock(results=[
-            MagicMock(index=1, relevance_score=0.95),
-            MagicMock(index=0, relevance_score=0.60),
+        mock_cohere.rerank.return_value = FakeRerankResponse([
+            RerankResult(index=1, relevance_score=0.95),
+            RerankResult(index=0, relevance_score=0.60),
         ])
 
         reranker = Reranker(top_n=2)
@@ -148,8 +375,22 @@ class TestReranker:
         assert result[1].text == "Low relevance"
         assert result[1].score == 0.60
 
-    @patch("src.retrieval.reranker.cohere.Client")
-    def test_reranker_handles_empty_candidates(self, mock_client_cls):
+    def test_reranker_sends_trimmed_docs_but_returns_full_text(self, mock_cohere):
+        mock_cohere.rerank.return_value = FakeRerankResponse([
+            RerankResult(index=0, relevance_score=0.9),
+        ])
+
+        long_text = "torque " * 200
+        reranker = Reranker(top_n=1, max_doc_chars=50)
+        result = reranker.rerank("query", [_chunk(long_text)])
+
+        sent = mock_cohere.rerank.call_args[1]["documents"][0]
+        assert len(sent) <= 50
+        assert not sent.endswith(" ")
+        assert result[0].text == long_text
+
+    def test_reranker_handles_empty_candidates(self, mock_cohere):
         reranker = Reranker(top_n=5)
         result = reranker.rerank("query", [])
         assert result == []
+        mock_cohere.rerank.assert_not_called()